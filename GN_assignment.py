@@ -1,8 +1,37 @@
-from z3 import Int, Solver, Or, And, sat
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
 import time
+import os
+import sys
+import contextlib
+import importlib.util
+import multiprocessing
+import queue
 from itertools import combinations
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from collections import Counter
+
+from GN_cache import LayoutCache
+from GN_geometry import Layout, adjacency_index, interchangeable_rooms, layout_fits
+from GN_grid import find_grid_solution
+
+def lazy_import(name):
+    """
+    Module whose import runs on first attribute access, so importing this module (for
+    the GUI or the batch workers) does not pay for z3 and numpy before the first solve.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+z3 = lazy_import("z3")
+np = lazy_import("numpy")
 
 # start_time = time.time()
 # Define the rooms
@@ -12,381 +41,1042 @@ outer_width = 0
 outer_height = 0
 holes = []
 
-def does_intersect(r1, r2):
-    """Check if two rectangles (x1, y1, x2, y2) intersect."""
-    (x1, y1, x2, y2) = r1
-    (a1, b1, a2, b2) = r2
-    return not (x2 <= a1 or a2 <= x1 or y2 <= b1 or b2 <= y1)
-
 def get_user_boundary():
     return outer_width, outer_height, holes, rooms, edges
 
-def visualize_boundary(ax, outer_width, outer_height, holes):
-    outer_rect = patches.Rectangle(
-        (0, 0),
-        outer_width,
-        outer_height,
-        linewidth=2,
-        edgecolor="blue",
-        facecolor="none",
-        linestyle="-",
-        alpha=0.7,
-    )
-    ax.add_patch(outer_rect)
-
-    for i, (x, y, width, height) in enumerate(holes):
-        hole_rect = patches.Rectangle(
-            (x, y),
-            width,
-            height,
-            linewidth=2,
-            edgecolor="red",
-            facecolor="red",
-            alpha=0.3,
-        )
-        ax.add_patch(hole_rect)
+def grow_rect(x, y, w, h, direction, amount):
+    """The rectangle after growing `amount` units towards `direction`, and the strip it adds."""
+    if direction == "left":
+        return (x - amount, y, w + amount, h), (x - amount, y, amount, h)
+    if direction == "right":
+        return (x, y, w + amount, h), (x + w, y, amount, h)
+    if direction == "down":
+        return (x, y - amount, w, h + amount), (x, y - amount, w, amount)
+    return (x, y, w, h + amount), (x, y + h, w, amount)
+
+class OccupancyGrid:
+    """
+    Cell occupancy of the plot (holes and rooms stamped in) with a summed-area table,
+    so "is this rectangle free" is four table lookups whatever its size.
+
+    Stamps go into the cell array and a short pending list right away. The table is
+    only rebuilt from the cells once `fold_after` stamps have piled up, so a stamp
+    costs its own cells plus an occasional O(plot) rebuild. A lookup costs the four
+    table reads plus a test against each pending stamp.
+    """
+
+    def __init__(self, outer_width, outer_height, holes=(), fold_after=32):
+        self.width = outer_width
+        self.height = outer_height
+        self.fold_after = fold_after
+        self.cells = np.zeros((outer_height, outer_width), dtype=np.int32)
+        self.table = np.zeros((outer_height + 1, outer_width + 1), dtype=np.int64)
+        self.pending = []  # (x1, y1, x2, y2) stamped since the table was last rebuilt
+        for hole_x, hole_y, hole_width, hole_height in holes:
+            x1, x2 = max(0, hole_x), min(outer_width, hole_x + hole_width)
+            y1, y2 = max(0, hole_y), min(outer_height, hole_y + hole_height)
+            if x2 > x1 and y2 > y1:
+                self.stamp(x1, y1, x2 - x1, y2 - y1)
+        self.fold()
+
+    def fold(self):
+        """Rebuild the summed-area table from the cells and clear the pending stamps."""
+        np.cumsum(np.cumsum(self.cells, axis=0), axis=1, out=self.table[1:, 1:])
+        self.pending = []
+
+    def count(self, x, y, w, h):
+        """Number of occupied cells in the w x h rectangle at (x, y) (inside the plot)."""
+        item = self.table.item
+        total = item(y + h, x + w) - item(y, x + w) - item(y + h, x) + item(y, x)
+        x2, y2 = x + w, y + h
+        for px1, py1, px2, py2 in self.pending:
+            if px1 < x2 and x < px2 and py1 < y2 and y < py2:
+                total += (min(x2, px2) - max(x, px1)) * (min(y2, py2) - max(y, py1))
+        return total
+
+    def is_free(self, x, y, w, h):
+        if x < 0 or y < 0 or x + w > self.width or y + h > self.height:
+            return False
+        return self.count(x, y, w, h) == 0
+
+    def free_extent(self, direction, x, y, w, h, limit):
+        """
+        How many rows/columns (at most `limit`) are free next to the w x h rectangle at
+        (x, y) on side `direction` ("left", "right", "down" or "up"). Free space on one
+        side is monotone in the depth, so this is a binary search over table lookups.
+        """
+        low, high = 0, limit
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.is_free(*grow_rect(x, y, w, h, direction, middle)[1]):
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def stamp(self, x, y, w, h):
+        """Mark a rectangle occupied."""
+        self.cells[y:y + h, x:x + w] += 1
+        self.pending.append((x, y, x + w, y + h))
+        if len(self.pending) >= self.fold_after:
+            self.fold()
 
-def compute_stretch(initial_layout, rooms, edges, outer_width, outer_height, holes):
+STRETCH_STEPS = ("unit", "jump")
+
+def compute_stretch(initial_layout, rooms, edges, outer_width, outer_height, holes, budget=None,
+                    step="unit"):
     """
-    Iteratively expands all rooms simultaneously with priority given to expansions
-    that increase contact with adjacent rooms.
-    Returns a dictionary of stretched rectangles: {room_name: (x, y, width, height)}.
+    Iteratively expands all rooms with priority given to expansions that increase
+    contact with adjacent rooms.
+    step="unit" grows each room by one unit per pass, so rooms share free space evenly
+    but the number of passes grows with the plot resolution. step="jump" grows each
+    room as far as it can go in the chosen direction in one move, so a handful of passes
+    suffice whatever the resolution, at the price of earlier rooms taking more space.
+    Free space is tracked on an OccupancyGrid that each expansion is stamped into right
+    away, so rooms growing in the same pass never claim the same cells.
+    Passes only visit rooms that grew in the previous pass: rooms never shrink and the
+    occupancy only fills up, so a room that is blocked on all four sides stays blocked
+    and late passes cost as much as the few rooms still growing.
+    If `budget` (a SolveBudget) runs out, stops after the current pass; every pass
+    leaves a valid layout.
+    `initial_layout` is a Layout, or {name: (x, y)} with rooms at their min size.
+    Returns the stretched rectangles as a new Layout.
     """
-    current_rects = {}
-    for name, (init_x, init_y) in initial_layout.items():
-        min_w, min_h, max_w, max_h = rooms[name]
-        current_rects[name] = [init_x, init_y, min_w, min_h, max_w, max_h]
+    if step not in STRETCH_STEPS:
+        raise ValueError(f"Unknown stretch step: {step}")
+    if not isinstance(initial_layout, Layout):
+        initial_layout = Layout.from_positions(initial_layout, rooms)
+    grid = OccupancyGrid(outer_width, outer_height, holes)
+    current_rects = initial_layout.copy()  # updated in place, room by room
+    for rect in current_rects.rows():
+        grid.stamp(*rect)
 
 
     all_room_names = list(rooms.keys())
+    adjacency = adjacency_index(rooms, edges)  # built once, not rescanned per room per pass
 
-    def get_forbidden(current_state, expanding_room=None):
-        forbidden = []
-        for name, rect in current_state.items():
-            if name == expanding_room:
-                continue
-            forbidden.append((rect[0], rect[1], rect[0] + rect[2], rect[1] + rect[3]))
-        for hx, hy, hw, hh in holes:
-            forbidden.append((hx, hy, hx + hw, hy + hh))
-        return forbidden
-
-    def is_free(rect, forbidden_rects):
-        cx, cy, cw, ch = rect
-        if cx < 0 or cy < 0 or cx + cw > outer_width or cy + ch > outer_height:
-            return False
-        candidate_rect = (cx, cy, cx + cw, cy + ch)
-        for forb in forbidden_rects:
-            if does_intersect(candidate_rect, forb):
-                return False
-        return True
-
-    def get_adjacent_rooms(room_name):
-        adjacent = []
-        for r1, r2 in edges:
-            if r1 == room_name:
-                adjacent.append(r2)
-            elif r2 == room_name:
-                adjacent.append(r1)
-        return adjacent
+    def get_overlap(rect1, rect2):
+        x_overlap = max(0, min(rect1[0] + rect1[2], rect2[0] + rect2[2]) - max(rect1[0], rect2[0]))
+        y_overlap = max(0, min(rect1[1] + rect1[3], rect2[1] + rect2[3]) - max(rect1[1], rect2[1]))
+        return x_overlap * y_overlap
 
     def does_increase_adjacency(r1_new, r1_old, r2_rect):
         """Check if r1_new has more overlap with r2_rect than r1_old."""
         x1_new, y1_new, w1_new, h1_new = r1_new[:4]
         x1_old, y1_old, w1_old, h1_old = r1_old[:4]
-        
-
-        def get_overlap(rect1, rect2):
-            x_overlap = max(0, min(rect1[0] + rect1[2], rect2[0] + rect2[2]) - max(rect1[0], rect2[0]))
-            y_overlap = max(0, min(rect1[1] + rect1[3], rect2[1] + rect2[3]) - max(rect1[1], rect2[1]))
-            return x_overlap * y_overlap
 
         overlap_new = get_overlap((x1_new, y1_new, w1_new, h1_new), r2_rect)
         overlap_old = get_overlap((x1_old, y1_old, w1_old, h1_old), r2_rect)
 
         return overlap_new > overlap_old
 
-    while True:
-        expanded_any = False
-        next_rects = current_rects.copy()
+    growing = all_room_names
+    while growing:
+        if budget is not None and budget.expired():
+            break
+        still_growing = []
 
-        for name in all_room_names:
-            x, y, w, h, max_w, max_h = current_rects[name]
-            forbidden = get_forbidden(current_rects, name)
-            adjacent_rooms = get_adjacent_rooms(name)
+        for name in growing:
+            x, y, w, h = current_rects[name]
+            _, _, max_w, max_h = rooms[name]
+            adjacent_rooms = adjacency[name]
             adjacent_rects = {adj: current_rects[adj] for adj in adjacent_rooms if adj in current_rects}
 
-            # Try expanding in each direction in priority order
-            possible_expansions = {}
-
-            candidate_left = [x - 1, y, w + 1, h, max_w, max_h]
-            if w + 1 <= max_w and is_free(candidate_left[:4], forbidden):
-                if adjacent_rooms:
-                    priority = sum(
-                        does_increase_adjacency(candidate_left, [x, y, w, h], adjacent_rects.get(adj, [0, 0, 0, 0]))
-                        for adj in adjacent_rooms
-                    )
-                else:
-                    priority = 1
-                possible_expansions["left"] = (candidate_left, priority)
-
-            candidate_right = [x, y, w + 1, h, max_w, max_h]
-            if w + 1 <= max_w and is_free(candidate_right[:4], forbidden):
-                if adjacent_rooms:
-                    priority = sum(
-                        does_increase_adjacency(candidate_right, [x, y, w, h], adjacent_rects.get(adj, [0, 0, 0, 0]))
-                        for adj in adjacent_rooms
-                    )
-                else:
-                    priority = 1
-                possible_expansions["right"] = (candidate_right, priority)
-
-            candidate_down = [x, y - 1, w, h + 1, max_w, max_h]
-            if h + 1 <= max_h and is_free(candidate_down[:4], forbidden):
-                if adjacent_rooms:
-                    priority = sum(
-                        does_increase_adjacency(candidate_down, [x, y, w, h], adjacent_rects.get(adj, [0, 0, 0, 0]))
-                        for adj in adjacent_rooms
-                    )
+            # Try expanding in each direction in priority order. Only the strip of cells
+            # a candidate adds needs checking: the rest is the room itself
+            best_expansion = None
+            best_strip = None
+            max_priority = -1
+            for direction in ("left", "right", "down", "up"):
+                room_left = max_w - w if direction in ("left", "right") else max_h - h
+                if room_left <= 0:
+                    continue
+                if step == "jump":
+                    amount = grid.free_extent(direction, x, y, w, h, room_left)
                 else:
-                    priority = 1
-                possible_expansions["down"] = (candidate_down, priority)
-
-            candidate_up = [x, y, w, h + 1, max_w, max_h]
-            if h + 1 <= max_h and is_free(candidate_up[:4], forbidden):
+                    amount = 1 if grid.is_free(*grow_rect(x, y, w, h, direction, 1)[1]) else 0
+                if amount == 0:
+                    continue
+                candidate, strip = grow_rect(x, y, w, h, direction, amount)
                 if adjacent_rooms:
                     priority = sum(
-                        does_increase_adjacency(candidate_up, [x, y, w, h], adjacent_rects.get(adj, [0, 0, 0, 0]))
+                        does_increase_adjacency(candidate, [x, y, w, h], adjacent_rects.get(adj, [0, 0, 0, 0]))
                         for adj in adjacent_rooms
                     )
                 else:
                     priority = 1
-                possible_expansions["up"] = (candidate_up, priority)
-
-            best_expansion = None
-            max_priority = -1
-            for direction, (candidate, priority) in possible_expansions.items():
-                if priority > max_priority:
+                if priority > max_priority:  # ties keep the first direction
                     max_priority = priority
                     best_expansion = candidate
-                elif priority == max_priority and best_expansion is None:
-                    best_expansion = candidate # just pick the first in case of ties
+                    best_strip = strip
 
             if best_expansion and max_priority >= 0:
-                next_rects[name] = best_expansion
-                expanded_any = True
+                current_rects[name] = best_expansion
+                grid.stamp(*best_strip)
+                still_growing.append(name)
+
+        growing = still_growing  # blocked rooms retire for good
+
+    return current_rects
+
+
+
+def compute_stretch_batch(layouts, rooms, edges, outer_width, outer_height, holes):
+    """
+    compute_stretch (unit steps) for many layouts of the same spec at once.
+
+    `layouts` is an integer array shaped (layouts, rooms, 4) of (x, y, w, h), with rooms
+    in `rooms` order, or a list of Layouts. Every expansion step runs on all layouts together as NumPy
+    operations over a (layouts, height, width) occupancy array, and each layout ends
+    up with exactly the rectangles compute_stretch would give it.
+    Returns (stretched, scores): the stretched (layouts, rooms, 4) array and a dict of
+    per-layout arrays, "area" (total room area), "adjacencies" (edges whose rooms share
+    a wall) and "shared_wall" (total wall length those edges share).
+    """
+    names = list(rooms)
+    index = {name: i for i, name in enumerate(names)}
+    rects = np.array(
+        [[layout[name] for name in names] if isinstance(layout, Layout) else layout for layout in layouts],
+        dtype=np.int64,
+    ).reshape(-1, len(names), 4)
+    max_w = np.array([rooms[name][2] for name in names])
+    max_h = np.array([rooms[name][3] for name in names])
+
+    occupied = np.zeros((len(rects), outer_height, outer_width), dtype=bool)
+    for hole_x, hole_y, hole_width, hole_height in holes:
+        occupied[:, max(0, hole_y):max(0, hole_y + hole_height), max(0, hole_x):max(0, hole_x + hole_width)] = True
+    for layout in range(len(rects)):
+        for x, y, w, h in rects[layout]:
+            occupied[layout, y:y + h, x:x + w] = True
+
+    # A grown room only ever adds a one-cell-wide strip, so each check gathers just the
+    # strip's cells: a (layouts, longest strip) array padded past each strip's length.
+    # A strip is as long as a side of its room, which may start out beyond the room's max
+    longest = max(max_w.max(initial=1), max_h.max(initial=1), rects[:, :, 2:].max(initial=1))
+    offsets = np.arange(min(max(outer_width, outer_height), longest))
+
+    def strip_cells(layout_ids, strip_x, strip_y, length, vertical):
+        valid = offsets[None, :] < length[:, None]
+        if vertical:
+            cells_y = np.minimum(strip_y[:, None] + offsets[None, :], outer_height - 1)
+            cells_x = np.broadcast_to(strip_x[:, None], cells_y.shape)
+        else:
+            cells_x = np.minimum(strip_x[:, None] + offsets[None, :], outer_width - 1)
+            cells_y = np.broadcast_to(strip_y[:, None], cells_x.shape)
+        return np.broadcast_to(layout_ids[:, None], valid.shape), cells_y, cells_x, valid
+
+    # Strips are free, so a grown room never overlaps a neighbour and the adjacency
+    # priority of compute_stretch is the same for every direction: ties keep the first
+    all_layouts = np.arange(len(rects))
+    growing = np.ones(rects.shape[:2], dtype=bool)  # blocked rooms retire, as in compute_stretch
+    while growing.any():
+        for i in range(len(names)):
+            if not growing[:, i].any():
+                continue
+            x, y, w, h = rects[:, i].T
+            chosen = np.zeros(len(rects), dtype=bool)
+            for direction in ("left", "right", "down", "up"):
+                vertical = direction in ("left", "right")  # the strip runs along a side wall
+                can_grow = (w < max_w[i]) if vertical else (h < max_h[i])
+                strip_x = {"left": x - 1, "right": x + w}.get(direction, x)
+                strip_y = {"down": y - 1, "up": y + h}.get(direction, y)
+                inside = (strip_x >= 0) & (strip_y >= 0) & (strip_x < outer_width) & (strip_y < outer_height)
+                candidates = np.flatnonzero(growing[:, i] & ~chosen & can_grow & inside)
+                if len(candidates) == 0:
+                    continue
+                length = (h if vertical else w)[candidates]
+                layout_ids, cells_y, cells_x, valid = strip_cells(
+                    all_layouts[candidates], strip_x[candidates], strip_y[candidates], length, vertical
+                )
+                free = ~(occupied[layout_ids, cells_y, cells_x] & valid).any(axis=1)
+                grown = candidates[free]
+                if len(grown) == 0:
+                    continue
+                chosen[grown] = True
+                occupied[layout_ids[free][valid[free]], cells_y[free][valid[free]], cells_x[free][valid[free]]] = True
+                rects[grown, i] = np.stack([v[grown] for v in grow_rect(x, y, w, h, direction, 1)[0]], axis=1)
+            growing[:, i] = chosen
+
+    x, y, w, h = (rects[:, :, k] for k in range(4))
+    shared_wall = np.zeros(len(rects), dtype=np.int64)
+    adjacencies = np.zeros(len(rects), dtype=np.int64)
+    for name1, name2 in edges:
+        i, j = index[name1], index[name2]
+        overlap_x = np.minimum(x[:, i] + w[:, i], x[:, j] + w[:, j]) - np.maximum(x[:, i], x[:, j])
+        overlap_y = np.minimum(y[:, i] + h[:, i], y[:, j] + h[:, j]) - np.maximum(y[:, i], y[:, j])
+        side = (x[:, i] + w[:, i] == x[:, j]) | (x[:, j] + w[:, j] == x[:, i])
+        stacked = (y[:, i] + h[:, i] == y[:, j]) | (y[:, j] + h[:, j] == y[:, i])
+        wall = np.where(side, np.maximum(overlap_y, 0), 0) + np.where(stacked, np.maximum(overlap_x, 0), 0)
+        shared_wall += wall
+        adjacencies += wall > 0
+    scores = {"area": (w * h).sum(axis=1), "adjacencies": adjacencies, "shared_wall": shared_wall}
+    return rects, scores
+
+NO_TIMEOUT = 4294967295  # z3's "no limit" value for the timeout parameter (ms)
+
+class SolveTimeout(Exception):
+    """Raised when a SolveBudget runs out or is cancelled (or a check comes back unknown) mid-solve."""
+
+class SolveBudget:
+    """
+    Wall-clock budget shared by every stage of one solve, plus the best layout seen so
+    far, so a solve that runs out of time can still hand back something usable.
+    `deadline` is an absolute time.time() value, or None for no limit.
+    `on_progress`, when given, is called from the solving thread with a progress() dict
+    after every solver check and every step of the relaxation.
+    cancel() may be called from another thread to stop the solve as if time ran out.
+    """
+
+    def __init__(self, deadline=None, on_progress=None):
+        self.deadline = deadline
+        self.on_progress = on_progress
+        self.cancelled = False
+        self.running = None  # the solver inside check(), if any
+        self.start = time.time()
+        self.removals = 0  # number of adjacencies the relaxation is currently trying to drop
+        self.candidates = 0  # solver checks / placement searches run so far
+        self.best = None  # (initial_layout, used_edges) of the best layout found so far
+        self.best_rectangles = None  # final rectangles of that layout, when the solver sized the rooms
+
+    @classmethod
+    def from_seconds(cls, seconds, on_progress=None):
+        return cls(None if seconds is None else time.time() + seconds, on_progress)
+
+    def remaining(self):
+        return None if self.deadline is None else self.deadline - time.time()
+
+    def expired(self):
+        return self.cancelled or (self.deadline is not None and time.time() >= self.deadline)
+
+    def cancel(self):
+        """
+        Stop the solve: interrupts the z3 check in progress (which then raises SolveTimeout)
+        and makes every later check and expired() test fail. Safe to call from another
+        thread, and repeatedly, which also catches a check that was just starting. Only
+        in-process solving is reached, not worker processes.
+        """
+        self.cancelled = True
+        s = self.running
+        if s is not None:
+            if hasattr(s, "interrupt"):
+                s.interrupt()  # only this solver, unlike interrupting the whole context
             else:
-                next_rects[name] = [x, y, w, h, max_w, max_h] # no expansion
+                s.ctx.interrupt()
+
+    def progress(self):
+        return {"removals": self.removals, "candidates": self.candidates, "elapsed": time.time() - self.start}
+
+    def notify(self, removals=None, candidates=0):
+        """Record a relaxation step and/or finished candidates and pass the progress on."""
+        if removals is not None:
+            self.removals = removals
+        self.candidates += candidates
+        if self.on_progress is not None:
+            self.on_progress(self.progress())
+
+    def check(self, s, *assumptions):
+        """s.check() limited to the time left; raises SolveTimeout instead of returning unknown."""
+        if self.cancelled:
+            raise SolveTimeout("solve cancelled")
+        if self.deadline is not None:
+            remaining = self.remaining()
+            if remaining <= 0:
+                raise SolveTimeout("time budget exhausted")
+            s.set("timeout", max(1, int(remaining * 1000)))
+        else:
+            s.set("timeout", NO_TIMEOUT)  # a reused solver may carry an earlier limit
+        self.running = s
+        try:
+            result = s.check(*assumptions)
+        finally:
+            self.running = None
+        self.notify(candidates=1)
+        if self.cancelled:
+            raise SolveTimeout("solve cancelled")
+        if result == z3.unknown:
+            raise SolveTimeout(s.reason_unknown())
+        return result
+
+    def record(self, initial_layout, used_edges, rectangles=None):
+        """Keep the layout if it satisfies more adjacencies than the best one so far."""
+        if self.best is None or len(used_edges) > len(self.best[1]):
+            self.best = (initial_layout, used_edges)
+            self.best_rectangles = rectangles
+
+def room_constraints(x, y, w, h, outer_width, outer_height, holes):
+    """Constraints keeping a w x h room at (x, y) inside the boundary and out of every hole."""
+    constraints = [x >= 0, y >= 0, x + w <= outer_width, y + h <= outer_height]
+    # Redundant for integers, but stops bit-vector coordinates from wrapping around
+    constraints += [x <= outer_width, y <= outer_height]
+    for hole_x, hole_y, hole_width, hole_height in holes:
+        constraints.append(
+            z3.Or(
+                x + w <= hole_x,
+                x >= hole_x + hole_width,
+                y + h <= hole_y,
+                y >= hole_y + hole_height,
+            )
+        )
+    return constraints
+
+def non_overlap_constraint(x1, y1, w1, h1, x2, y2, w2, h2):
+    """Two rooms must not overlap (touching edges is fine)."""
+    return z3.Or(
+        x1 + w1 <= x2,
+        x2 + w2 <= x1,
+        y1 + h1 <= y2,
+        y2 + h2 <= y1,
+    )
+
+def adjacency_constraint(x1, y1, w1, h1, x2, y2, w2, h2):
+    """Two rooms must share a wall segment of positive length."""
+    left_of = z3.And(
+        x1 + w1 == x2,
+        z3.Or(
+            z3.And(y1 <= y2, y1 + h1 > y2),
+            z3.And(y2 <= y1, y2 + h2 > y1),
+        ),
+    )
+
+    right_of = z3.And(
+        x2 + w2 == x1,
+        z3.Or(
+            z3.And(y1 <= y2, y1 + h1 > y2),
+            z3.And(y2 <= y1, y2 + h2 > y1),
+        ),
+    )
 
-        if not expanded_any:
-            break  # no room could be expanded
-        current_rects = next_rects
+    above = z3.And(
+        y1 + h1 == y2,
+        z3.Or(
+            z3.And(x1 <= x2, x1 + w1 > x2),
+            z3.And(x2 <= x1, x2 + w2 > x1),
+        ),
+    )
 
-    return {name: (x, y, w, h) for name, (x, y, w, h, _, _) in current_rects.items()}
+    below = z3.And(
+        y2 + h2 == y1,
+        z3.Or(
+            z3.And(x1 <= x2, x1 + w1 > x2),
+            z3.And(x2 <= x1, x2 + w2 > x1),
+        ),
+    )
 
+    return z3.Or(left_of, right_of, above, below)
 
+def coordinate_variables(rooms, outer_width, outer_height, holes, encoding="int"):
+    """
+    Create the (x, y) solver variables of every room.
 
-def find_valid_solution(rooms, edges, outer_width, outer_height, holes, max_removals=None):
-    s = Solver()
-    positions = {}
-    for name in rooms:
-        x_coordinate = Int(f"x_{name}")
-        y_coordinate = Int(f"y_{name}")
-        positions[name] = (x_coordinate, y_coordinate)
+    "int" uses unbounded integers and linear arithmetic. "bitvec" uses signed bit-vectors
+    just wide enough for the plot (coordinates are kept in [0, outer] by room_constraints,
+    so sums like x + w never overflow), which z3 bit-blasts into a pure SAT problem.
+    """
+    if encoding == "int":
+        return {name: (z3.Int(f"x_{name}"), z3.Int(f"y_{name}")) for name in rooms}
+    if encoding == "bitvec":
+        largest_room = max((max(dims[0], dims[1]) for dims in rooms.values()), default=0)
+        largest_value = max(
+            [outer_width, outer_height]
+            + [max(abs(hx) + hw, abs(hy) + hh) for hx, hy, hw, hh in holes]
+        )
+        # Room for 2 * x + w (symmetry breaking) plus a sign bit
+        bits = (2 * (largest_value + largest_room)).bit_length() + 1
+        return {name: (z3.BitVec(f"x_{name}", bits), z3.BitVec(f"y_{name}", bits)) for name in rooms}
+    raise ValueError(f"Unknown encoding: {encoding}")
 
-    # Basic constraints (always apply)
+def add_base_constraints(s, positions, rooms, outer_width, outer_height, holes):
+    """Add the bounds, hole and pairwise non-overlap constraints (always apply)."""
     for name, (x, y) in positions.items():
-        s.add(x >= 0, y >= 0)
         min_w, min_h, _, _ = rooms[name]
-        w, h = min_w, min_h
-        s.add(x + w <= outer_width)
-        s.add(y + h <= outer_height)
-        for hole_x, hole_y, hole_width, hole_height in holes:
-            s.add(
-                Or(
-                    x + w <= hole_x,
-                    x >= hole_x + hole_width,
-                    y + h <= hole_y,
-                    y >= hole_y + hole_height,
-                )
-            )
+        s.add(room_constraints(x, y, min_w, min_h, outer_width, outer_height, holes))
 
-    # Non-overlapping constraint (always apply)
     for name1, name2 in combinations(rooms.keys(), 2):
         x1, y1 = positions[name1]
         x2, y2 = positions[name2]
         min_w1, min_h1, _, _ = rooms[name1]
         min_w2, min_h2, _, _ = rooms[name2]
-        w1, h1 = min_w1, min_h1
-        w2, h2 = min_w2, min_h2
+        s.add(non_overlap_constraint(x1, y1, min_w1, min_h1, x2, y2, min_w2, min_h2))
+
+def edge_constraint(positions, rooms, name1, name2):
+    """Adjacency constraint for the edge (name1, name2) with rooms at their min size."""
+    x1, y1 = positions[name1]
+    x2, y2 = positions[name2]
+    min_w1, min_h1, _, _ = rooms[name1]
+    min_w2, min_h2, _, _ = rooms[name2]
+    return adjacency_constraint(x1, y1, min_w1, min_h1, x2, y2, min_w2, min_h2)
+
+def boundary_symmetries(outer_width, outer_height, holes):
+    """Return (mirror_x, mirror_y): whether the boundary and holes are unchanged by a left-right / top-bottom flip."""
+    hole_set = Counter(tuple(hole) for hole in holes)
+    mirror_x = Counter((outer_width - x - w, y, w, h) for x, y, w, h in holes) == hole_set
+    mirror_y = Counter((x, outer_height - y - h, w, h) for x, y, w, h in holes) == hole_set
+    return mirror_x, mirror_y
+
+def add_symmetry_breaking(s, positions, rooms, edges, outer_width, outer_height, holes, edge_weights=None):
+    """
+    Rule out placements that are mere relabellings or mirror images of each other.
+
+    Interchangeable rooms are kept in lexicographic (x, y) order. If the boundary is
+    mirror-symmetric, one room that is not interchangeable with any other is pinned to
+    the left/bottom half; since it is never relabelled, the mirror and the ordering can
+    be applied one after the other and so never exclude every copy of a solution.
+    Edge relaxation still finds the same number of removed edges, though possibly a
+    symmetric counterpart of the edges the unbroken model would drop. With `edge_weights`
+    only rooms whose swap keeps every priority count as interchangeable, so the weighted
+    optimum is kept too.
+    """
+    groups = interchangeable_rooms(rooms, edges, edge_weights)
+    for group in groups:
+        for name1, name2 in zip(group, group[1:]):
+            x1, y1 = positions[name1]
+            x2, y2 = positions[name2]
+            s.add(z3.Or(x1 < x2, z3.And(x1 == x2, y1 <= y2)))
+
+    grouped = {name for group in groups for name in group}
+    anchors = [name for name in rooms if name not in grouped]
+    mirror_x, mirror_y = boundary_symmetries(outer_width, outer_height, holes)
+    if anchors:
+        x, y = positions[anchors[0]]
+        min_w, min_h, _, _ = rooms[anchors[0]]
+        if mirror_x:
+            s.add(2 * x + min_w <= outer_width)
+        if mirror_y:
+            s.add(2 * y + min_h <= outer_height)
+    return groups, (mirror_x and bool(anchors), mirror_y and bool(anchors))
+
+def layout_from_model(model, positions, rooms, sizes=None):
+    """
+    Read each room's (x, y) out of a z3 model into a Layout, with the (w, h) from
+    `sizes` (solver variables) when given and the room's min size otherwise.
+    """
+    def value(term):
+        return model.eval(term, model_completion=True).as_long()
+
+    return Layout(positions, (
+        (value(x), value(y), *(map(value, sizes[name]) if sizes else rooms[name][:2]))
+        for name, (x, y) in positions.items()
+    ))
+
+def satisfied_edges(model, positions, rooms, edges):
+    """The edges whose adjacency happens to hold in `model`."""
+    return [
+        (name1, name2) for name1, name2 in edges
+        if z3.is_true(model.eval(edge_constraint(positions, rooms, name1, name2), model_completion=True))
+    ]
 
+def record_fallback(budget, s, positions, rooms, edges, base_assumptions=()):
+    """
+    Under a deadline, solve the base model without any adjacency first so a timed-out
+    relaxation still has a layout (with whichever adjacencies hold by chance) to return.
+    """
+    if budget.deadline is None:
+        return
+    if budget.check(s, *base_assumptions) == z3.sat:
+        model = s.model()
+        budget.record(layout_from_model(model, positions, rooms), satisfied_edges(model, positions, rooms, edges))
 
-        s.add(
-            Or(
-                x1 + w1 <= x2,
-                x2 + w2 <= x1,
-                y1 + h1 <= y2,
-                y2 + h2 <= y1,
-            )
-        )
+def first_hitting_set(cores, size):
+    """
+    Return the first combination (in itertools order) of `size` edge indices that
+    intersects every core, or None. Only edges that appear in some core are
+    considered: a cheaper hitting set would already have been tried at a smaller size.
+    """
+    candidates = sorted(set().union(*cores))
+    for removal in combinations(candidates, size):
+        removed = set(removal)
+        if all(core & removed for core in cores):
+            return removal
+    return None
+
+def unsat_core_indices(s, edge_literals):
+    """Indices of the edges whose tracking literals appear in the solver's last unsat core."""
+    core_ids = {literal.get_id() for literal in s.unsat_core()}
+    return frozenset(i for i, literal in enumerate(edge_literals) if literal.get_id() in core_ids)
+
+def keep_soft(budget, s, assumptions, soft):
+    """
+    Model satisfying `assumptions` (already known to be satisfiable) and as many of the
+    `soft` literals as the solver can keep: each unsat check drops one soft literal
+    named in its core from the `soft` list (in place) until the rest hold.
+    """
+    while soft:
+        if budget.check(s, *assumptions, *soft) == z3.sat:
+            return s.model()
+        core_ids = {literal.get_id() for literal in s.unsat_core()}
+        soft.remove(next(literal for literal in soft if literal.get_id() in core_ids))
+    budget.check(s, *assumptions)
+    return s.model()
+
+def relax_with_cores(s, edge_literals, first_core, max_removals, base_assumptions=(), budget=None):
+    """
+    Find the smallest set of adjacency constraints to drop, using assumption literals.
+
+    `s` already holds the base model and one `Implies(literal, adjacency)` per edge.
+    Every unsat core names a set of edges that cannot all hold together, so any valid
+    removal must hit every core found so far. We only check removals that do, smallest
+    first and in the same order as `combinations(edges, k)`, which gives the same answer
+    as the exhaustive subset search in a handful of incremental checks.
+    Returns (model, removed_indices) or (None, None); raises SolveTimeout if `budget` runs out.
+    """
+    budget = budget or SolveBudget()
+    if not first_core:
+        return None, None  # infeasible even without any adjacency
+    cores = [first_core]
+    for num_to_remove in range(1, max_removals + 1):
+        print(f"Trying to remove {num_to_remove} adjacency constraints...")
+        budget.notify(removals=num_to_remove)
+        while True:
+            removal = first_hitting_set(cores, num_to_remove)
+            if removal is None:
+                break  # every removal of this size still leaves a core intact
+            assumptions = list(base_assumptions) + [
+                literal for i, literal in enumerate(edge_literals) if i not in removal
+            ]
+            if budget.check(s, *assumptions) == z3.sat:
+                return s.model(), removal
+            core = unsat_core_indices(s, edge_literals)
+            if not core:
+                return None, None
+            cores.append(core)
+    return None, None
 
-    # Try with all adjacencies first
-    adjacency_constraints = []
-    for name1, name2 in edges:
-        x1, y1 = positions[name1]
-        x2, y2 = positions[name2]
-        min_w1, min_h1, _, _ = rooms[name1]
-        min_w2, min_h2, _, _ = rooms[name2]
-        w1, h1 = min_w1, min_h1
-        w2, h2 = min_w2, min_h2
+def build_guarded_model(rooms, edges, outer_width, outer_height, holes, symmetry_breaking=False,
+                        encoding="int"):
+    """
+    Build a solver holding the base model plus one `Implies(literal, adjacency)` per edge.
+    Returns (solver, positions, edge_literals).
+    """
+    s = z3.Solver()
+    s.set("core.minimize", True)
+    positions = coordinate_variables(rooms, outer_width, outer_height, holes, encoding)
+
+    add_base_constraints(s, positions, rooms, outer_width, outer_height, holes)
+    if symmetry_breaking:
+        add_symmetry_breaking(s, positions, rooms, edges, outer_width, outer_height, holes)
+
+    edge_literals = []
+    for i, (name1, name2) in enumerate(edges):
+        literal = z3.Bool(f"adj_{i}_{name1}_{name2}")
+        s.add(z3.Implies(literal, edge_constraint(positions, rooms, name1, name2)))
+        edge_literals.append(literal)
+    return s, positions, edge_literals
+
+# Per-process model for parallel subset relaxation, built once by subset_worker_init
+subset_worker_state = {}
+
+def subset_worker_init(rooms, edges, outer_width, outer_height, holes, symmetry_breaking, encoding,
+                       deadline=None):
+    s, positions, edge_literals = build_guarded_model(
+        rooms, edges, outer_width, outer_height, holes, symmetry_breaking, encoding
+    )
+    subset_worker_state.update(
+        solver=s, positions=positions, rooms=rooms, edge_literals=edge_literals, budget=SolveBudget(deadline)
+    )
 
+def subset_worker_check(removal):
+    """Check one candidate removal (tuple of edge indices) on this worker's model."""
+    s = subset_worker_state["solver"]
+    edge_literals = subset_worker_state["edge_literals"]
+    budget = subset_worker_state["budget"]
+    if budget.check(s, *[literal for i, literal in enumerate(edge_literals) if i not in removal]) == z3.sat:
+        return layout_from_model(s.model(), subset_worker_state["positions"], subset_worker_state["rooms"])
+    return None
 
-        left_of = And(
-            x1 + w1 == x2,
-            Or(
-                And(y1 <= y2, y1 + h1 > y2),
-                And(y2 <= y1, y2 + h2 > y1),
-            ),
-        )
+def terminate_executor(executor):
+    """
+    Shut a ProcessPoolExecutor down without waiting for the jobs it is running: its
+    worker processes are killed first (what terminate_workers() does from Python 3.14).
+    """
+    if hasattr(executor, "terminate_workers"):
+        executor.terminate_workers()
+        return
+    for process in list((executor._processes or {}).values()):
+        if process.is_alive():
+            process.terminate()
+    executor.shutdown(wait=True, cancel_futures=True)
 
-        right_of = And(
-            x2 + w2 == x1,
-            Or(
-                And(y1 <= y2, y1 + h1 > y2),
-                And(y2 <= y1, y2 + h2 > y1),
-            ),
-        )
+def relax_subsets_parallel(rooms, edges, outer_width, outer_height, holes, max_removals, workers,
+                           symmetry_breaking=False, encoding="int", budget=None):
+    """
+    Subset relaxation with the candidates for each removal count spread over `workers`
+    processes. Each worker builds the model once and checks candidates under assumptions.
+    As soon as a candidate is SAT no later candidate is submitted, and once every earlier
+    candidate has finished the lowest-index SAT one wins, exactly as in the sequential
+    combinations() order. The workers are terminated on return, so checks still running
+    never outlive the call. Returns (initial_layout, removed_indices) or (None, None);
+    raises SolveTimeout when `budget` runs out or is cancelled, and BrokenProcessPool
+    if a worker dies mid-check.
+    """
+    budget = budget or SolveBudget()
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=subset_worker_init,
+        initargs=(rooms, edges, outer_width, outer_height, holes, symmetry_breaking, encoding,
+                  budget.deadline),
+    )
+    try:
+        for num_to_remove in range(1, max_removals + 1):
+            print(f"Trying to remove {num_to_remove} adjacency constraints...")
+            budget.notify(removals=num_to_remove)
+            candidates = enumerate(combinations(range(len(edges)), num_to_remove))
+            in_flight = {}
+            best = None  # (candidate index, removal, layout)
+            exhausted = False
+            while True:
+                # Keep every worker busy, but never submit past a known SAT candidate
+                while best is None and not exhausted and len(in_flight) < 2 * workers:
+                    try:
+                        index, removal = next(candidates)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    in_flight[pool.submit(subset_worker_check, removal)] = (index, removal)
+                if not in_flight:
+                    break
+                # Wake up regularly so a cancel or the deadline is noticed between results
+                done, _ = wait(in_flight, timeout=0.1, return_when=FIRST_COMPLETED)
+                if budget.cancelled:
+                    raise SolveTimeout("solve cancelled")
+                if budget.expired():
+                    raise SolveTimeout("time budget exhausted")
+                budget.notify(candidates=len(done))
+                for future in done:
+                    index, removal = in_flight.pop(future)
+                    layout = future.result()  # BrokenProcessPool if its worker died
+                    if layout is not None and (best is None or index < best[0]):
+                        best = (index, removal, layout)
+                if best is not None:
+                    # Later candidates can no longer win; terminate_executor stops any still running
+                    for future, (index, _) in list(in_flight.items()):
+                        if index > best[0]:
+                            future.cancel()
+                            del in_flight[future]
+            if best is not None:
+                return best[2], best[1]
+        return None, None
+    finally:
+        terminate_executor(pool)
+
+def edge_weight(edge_weights, name1, name2):
+    """Priority of the edge (name1, name2) in either orientation; edges not listed weigh 1."""
+    if not edge_weights:
+        return 1
+    return edge_weights.get((name1, name2), edge_weights.get((name2, name1), 1))
+
+def add_removal_cap(o, adjacency_constraints, max_removals):
+    """Make at most `max_removals` of the (soft) adjacency constraints false, as a hard constraint."""
+    if max_removals is not None and max_removals < len(adjacency_constraints):
+        o.add(z3.AtMost(*[z3.Not(adj_constraint) for adj_constraint in adjacency_constraints], max_removals))
+
+def find_weighted_solution(rooms, edges, outer_width, outer_height, holes, edge_weights=None,
+                           symmetry_breaking=False, encoding="int", budget=None, max_removals=None):
+    """
+    MaxSMT variant of find_valid_solution: every adjacency is a soft constraint weighted
+    by its priority in `edge_weights` ({(name1, name2): weight}), and a single Optimize
+    call maximises the total satisfied weight, with at most `max_removals` of them
+    dropped (None for no limit).
+    Returns (initial_layout, used_edges) or (None, None). If `budget` runs out, the best
+    model the optimiser reached is recorded on it and SolveTimeout is raised.
+    """
+    budget = budget or SolveBudget()
+    o = z3.Optimize()
+    positions = coordinate_variables(rooms, outer_width, outer_height, holes, encoding)
 
-        above = And(
-            y1 + h1 == y2,
-            Or(
-                And(x1 <= x2, x1 + w1 > x2),
-                And(x2 <= x1, x2 + w2 > x1),
-            ),
-        )
+    add_base_constraints(o, positions, rooms, outer_width, outer_height, holes)
+    if symmetry_breaking:
+        add_symmetry_breaking(o, positions, rooms, edges, outer_width, outer_height, holes, edge_weights)
 
-        below = And(
-            y2 + h2 == y1,
-            Or(
-                And(x1 <= x2, x1 + w1 > x2),
-                And(x2 <= x1, x2 + w2 > x1),
-            ),
-        )
+    adjacency_constraints = []
+    for name1, name2 in edges:
+        adj_constraint = edge_constraint(positions, rooms, name1, name2)
+        o.add_soft(adj_constraint, edge_weight(edge_weights, name1, name2))
+        adjacency_constraints.append(adj_constraint)
+    add_removal_cap(o, adjacency_constraints, max_removals)
 
-        adj_constraint = Or(left_of, right_of, above, below)
-        adjacency_constraints.append((name1, name2, adj_constraint))
-        s.add(adj_constraint)
+    solution_start = time.time()
+    try:
+        result = budget.check(o)
+    except SolveTimeout:
+        try:
+            model = o.model()  # best assignment the optimiser had reached, if it is a valid one
+        except Exception:
+            model = None
+        if model is not None and all(z3.is_true(model.eval(a, model_completion=True)) for a in o.assertions()):
+            budget.record(layout_from_model(model, positions, rooms), satisfied_edges(model, positions, rooms, edges))
+        raise
+    if result != z3.sat:
+        print("No valid layout found even after removing all adjacency constraints")
+        return None, None
+
+    model = o.model()
+    initial_layout = layout_from_model(model, positions, rooms)
+    used_edges = [
+        edge for edge, adj_constraint in zip(edges, adjacency_constraints)
+        if z3.is_true(model.eval(adj_constraint, model_completion=True))
+    ]
+    solution_end = time.time()
+    print(f"Weighted solution satisfies {len(used_edges)} of {len(edges)} adjacencies in",
+          solution_end - solution_start, "seconds")
+    removed_edges = [edge for edge in edges if edge not in used_edges]
+    if removed_edges:
+        print("Removed adjacencies:", tuple(removed_edges))
+    return initial_layout, used_edges
+
+SIZING_OBJECTIVES = ("area", "walls")
+
+# solve_layout options that change the result, with their defaults; non-default values
+# are part of the cache key
+RESULT_OPTIONS = {"max_removals": None, "backend": "z3", "relaxation": "core",
+                  "symmetry_breaking": False, "encoding": "int", "portfolio": False}
+
+def size_variables(rooms, outer_width, outer_height):
+    """Solver (w, h) of every room with its [min, max] bounds (max capped at the plot size)."""
+    sizes = {}
+    bounds = []
+    for name, (min_w, min_h, max_w, max_h) in rooms.items():
+        w, h = z3.Int(f"w_{name}"), z3.Int(f"h_{name}")
+        sizes[name] = (w, h)
+        bounds += [w >= min_w, w <= max(min_w, min(max_w, outer_width)),
+                   h >= min_h, h <= max(min_h, min(max_h, outer_height))]
+    return sizes, bounds
+
+def room_area(rooms, name, w, h, outer_width):
+    """w * h as a linear term: one If per possible width, each multiplying h by a constant."""
+    min_w, _, max_w, _ = rooms[name]
+    return z3.Sum([z3.If(w == width, width * h, 0)
+                for width in range(min_w, max(min_w, min(max_w, outer_width)) + 1)])
+
+def shared_wall(x1, y1, w1, h1, x2, y2, w2, h2):
+    """Length of the wall two non-overlapping rooms share (0 if they do not touch)."""
+    def overlap(start1, end1, start2, end2):
+        length = z3.If(end1 < end2, end1, end2) - z3.If(start1 > start2, start1, start2)
+        return z3.If(length > 0, length, 0)
+
+    return (z3.If(z3.Or(x1 + w1 == x2, x2 + w2 == x1), overlap(y1, y1 + h1, y2, y2 + h2), 0)
+            + z3.If(z3.Or(y1 + h1 == y2, y2 + h2 == y1), overlap(x1, x1 + w1, x2, x2 + w2), 0))
+
+def add_sized_constraints(s, rooms, edges, outer_width, outer_height, holes, symmetry_breaking=False,
+                          edge_weights=None):
+    """
+    Add the base model with solver-chosen sizes to `s`.
+    Returns (positions, sizes, adjacency_constraints), the last one per edge.
+    """
+    positions = coordinate_variables(rooms, outer_width, outer_height, holes)
+    sizes, bounds = size_variables(rooms, outer_width, outer_height)
+    s.add(bounds)
+    for name, (x, y) in positions.items():
+        w, h = sizes[name]
+        s.add(room_constraints(x, y, w, h, outer_width, outer_height, holes))
+    for name1, name2 in combinations(rooms.keys(), 2):
+        s.add(non_overlap_constraint(*positions[name1], *sizes[name1], *positions[name2], *sizes[name2]))
+    if symmetry_breaking:
+        # Interchangeable rooms share their size bounds, and 2 * x + min_w <= W is implied
+        # by 2 * x + w <= W, so the min-size constraints stay sound
+        add_symmetry_breaking(s, positions, rooms, edges, outer_width, outer_height, holes, edge_weights)
+
+    adjacency_constraints = [
+        adjacency_constraint(*positions[name1], *sizes[name1], *positions[name2], *sizes[name2])
+        for name1, name2 in edges
+    ]
+    return positions, sizes, adjacency_constraints
+
+def find_sized_solution(rooms, edges, outer_width, outer_height, holes, objective="area",
+                        edge_weights=None, symmetry_breaking=False, budget=None, max_removals=None):
+    """
+    Place and size every room in the solver instead of placing at min size and
+    stretching afterwards. Widths and heights are solver variables within each room's
+    (min_w, min_h, max_w, max_h), so layouts that only exist with bigger rooms are found.
+
+    First, adjacencies are soft constraints as in find_weighted_solution (at most
+    `max_removals` of them dropped). Then, with the
+    satisfied ones made hard, the objective is raised one solver check at a time:
+    objective="area" maximises the total room area, objective="walls" the total wall
+    length the adjacencies share. Returns (rectangles, used_edges) with rectangles a
+    Layout, or (None, None). If `budget` runs out while choosing the
+    adjacencies, the best valid model is recorded on it and SolveTimeout is raised; if it
+    runs out while growing the rooms, the largest layout so far is returned.
+    """
+    if objective not in SIZING_OBJECTIVES:
+        raise ValueError(f"Unknown sizing objective: {objective}")
+    budget = budget or SolveBudget()
+
+    # Phase 1: which adjacencies can hold, weighted by priority
+    o = z3.Optimize()
+    positions, sizes, adjacency_constraints = add_sized_constraints(
+        o, rooms, edges, outer_width, outer_height, holes, symmetry_breaking, edge_weights
+    )
+    for (name1, name2), adj_constraint in zip(edges, adjacency_constraints):
+        o.add_soft(adj_constraint, edge_weight(edge_weights, name1, name2))
+    add_removal_cap(o, adjacency_constraints, max_removals)
 
     solution_start = time.time()
-    if s.check() == sat:
-        model = s.model()
-        initial_layout = {
-            name: (model[x].as_long(), model[y].as_long())
-            for name, (x, y) in positions.items()
+    try:
+        result = budget.check(o)
+    except SolveTimeout:
+        try:
+            model = o.model()
+        except Exception:
+            model = None
+        if model is not None and all(z3.is_true(model.eval(a, model_completion=True)) for a in o.assertions()):
+            rectangles = layout_from_model(model, positions, rooms, sizes)
+            used_edges = [edge for edge, adj_constraint in zip(edges, adjacency_constraints)
+                          if z3.is_true(model.eval(adj_constraint, model_completion=True))]
+            budget.record(rectangles, used_edges, rectangles)
+        raise
+    if result != z3.sat:
+        print("No valid layout found even after removing all adjacency constraints")
+        return None, None
+    model = o.model()
+    used = [i for i, adj_constraint in enumerate(adjacency_constraints)
+            if z3.is_true(model.eval(adj_constraint, model_completion=True))]
+    used_edges = [edges[i] for i in used]
+
+    # Phase 2: grow the rooms with those adjacencies fixed. Each check asks for a strictly
+    # better layout, which is much faster than handing the If-heavy objective to Optimize
+    s = z3.Solver()
+    positions, sizes, adjacency_constraints = add_sized_constraints(
+        s, rooms, edges, outer_width, outer_height, holes, symmetry_breaking, edge_weights
+    )
+    s.add([adjacency_constraints[i] for i in used])
+    ceiling = None  # a value no layout can beat, to skip the final (often slow) unsat proof
+    if objective == "area":
+        goal = z3.Sum([room_area(rooms, name, *sizes[name], outer_width) for name in rooms])
+        hole_cells = {
+            (x, y)
+            for hole_x, hole_y, hole_width, hole_height in holes
+            for x in range(max(0, hole_x), min(outer_width, hole_x + hole_width))
+            for y in range(max(0, hole_y), min(outer_height, hole_y + hole_height))
         }
+        ceiling = outer_width * outer_height - len(hole_cells)
+    else:
+        goal = z3.Sum([shared_wall(*positions[edges[i][0]], *sizes[edges[i][0]],
+                                *positions[edges[i][1]], *sizes[edges[i][1]]) for i in used] or [0])
+    rectangles = layout_from_model(model, positions, rooms, sizes)
+    best = model.eval(goal, model_completion=True).as_long()
+    try:
+        while best != ceiling and budget.check(s, goal > best) == z3.sat:
+            model = s.model()
+            rectangles = layout_from_model(model, positions, rooms, sizes)
+            best = model.eval(goal, model_completion=True).as_long()
+    except SolveTimeout:
+        print(f"Time budget ran out while growing rooms, keeping {objective} = {best}")
+
+    solution_end = time.time()
+    print(f"Sized solution satisfies {len(used_edges)} of {len(edges)} adjacencies "
+          f"with {objective} = {best} in", solution_end - solution_start, "seconds")
+    removed_edges = [edge for i, edge in enumerate(edges) if i not in used]
+    if removed_edges:
+        print("Removed adjacencies:", tuple(removed_edges))
+    return rectangles, used_edges
+
+def find_valid_solution(rooms, edges, outer_width, outer_height, holes, max_removals=None,
+                        relaxation="core", edge_weights=None, symmetry_breaking=False,
+                        encoding="int", workers=None, budget=None, backend="z3"):
+    """
+    Place every room at its min size so that as many adjacencies as possible hold.
+
+    relaxation="core" (default) guards each adjacency with a tracking literal and uses
+    unsat cores to pick which edges to drop, reusing one solver throughout.
+    relaxation="subsets" rebuilds a solver for every subset of removed edges, or with
+    workers > 1 checks the subsets of each size on a pool of worker processes.
+    relaxation="maxsmt" treats adjacencies as soft constraints weighted by
+    `edge_weights` and maximises the satisfied weight in one optimisation call.
+    symmetry_breaking=True adds ordering constraints for interchangeable rooms and
+    mirror-symmetric boundaries (see add_symmetry_breaking).
+    encoding picks the coordinate representation, "int" or "bitvec" (see coordinate_variables).
+    budget (a SolveBudget) bounds every solver call; when it runs out SolveTimeout is
+    raised and budget.best holds the best layout found so far (see solve_layout).
+    backend="grid" skips z3 and backtracks over a bitset occupancy grid (GN_grid); it
+    always relaxes like "subsets" and ignores the z3-specific options.
+    Returns (initial_layout, used_edges), initial_layout being a Layout of every room at
+    its min size, or (None, None).
+    """
+    budget = budget or SolveBudget()
+    if backend == "grid":
+        try:
+            return find_grid_solution(rooms, edges, outer_width, outer_height, holes, max_removals, budget)
+        except TimeoutError as e:
+            raise SolveTimeout(str(e))
+    if backend != "z3":
+        raise ValueError(f"Unknown backend: {backend}")
+    if relaxation not in ("core", "subsets", "maxsmt"):
+        raise ValueError(f"Unknown relaxation mode: {relaxation}")
+    if relaxation == "maxsmt":
+        return find_weighted_solution(rooms, edges, outer_width, outer_height, holes, edge_weights,
+                                      symmetry_breaking, encoding, budget, max_removals)
+
+    # Try with all adjacencies first, each guarded by its own tracking literal
+    s, positions, edge_literals = build_guarded_model(
+        rooms, edges, outer_width, outer_height, holes, symmetry_breaking, encoding
+    )
+
+    solution_start = time.time()
+    if budget.check(s, *edge_literals) == z3.sat:
+        model = s.model()
+        initial_layout = layout_from_model(model, positions, rooms)
         solution_end = time.time()
         print("Solution found with all adjacencies in", solution_end - solution_start, "seconds")
         return initial_layout, edges  # Return both layout and edges used
 
     # If no solution with all adjacencies, try removing some
     print("No solution with all adjacencies, trying to remove some...")
+    core = unsat_core_indices(s, edge_literals)
+    record_fallback(budget, s, positions, rooms, edges)
     
     if max_removals is None:
         max_removals = len(edges)  # Try removing up to all adjacencies if needed
-    
+
+    if relaxation == "core":
+        model, removal = relax_with_cores(s, edge_literals, core, max_removals, budget=budget)
+        if model is not None:
+            initial_layout = layout_from_model(model, positions, rooms)
+            edges_to_remove = tuple(edges[i] for i in removal)
+            remaining_edges = [edge for i, edge in enumerate(edges) if i not in removal]
+            solution_end = time.time()
+            print(f"Solution found by removing {len(removal)} adjacencies in",
+                  solution_end - solution_start, "seconds")
+            print("Removed adjacencies:", edges_to_remove)
+            return initial_layout, remaining_edges
+
+        print("No valid layout found even after removing all adjacency constraints")
+        return None, None
+
+    if workers and workers > 1:
+        initial_layout, removal = relax_subsets_parallel(
+            rooms, edges, outer_width, outer_height, holes, max_removals, workers,
+            symmetry_breaking, encoding, budget,
+        )
+        if initial_layout is not None:
+            remaining_edges = [edge for i, edge in enumerate(edges) if i not in removal]
+            solution_end = time.time()
+            print(f"Solution found by removing {len(removal)} adjacencies in",
+                  solution_end - solution_start, "seconds")
+            print("Removed adjacencies:", tuple(edges[i] for i in removal))
+            return initial_layout, remaining_edges
+
+        print("No valid layout found even after removing all adjacency constraints")
+        return None, None
+
     for num_to_remove in range(1, max_removals + 1):
         print(f"Trying to remove {num_to_remove} adjacency constraints...")
+        budget.notify(removals=num_to_remove)
         
         # Try all combinations of removing 'num_to_remove' edges
         for edges_to_remove in combinations(edges, num_to_remove):
-            s = Solver()
-            
-            # Re-add basic constraints
-            for name, (x, y) in positions.items():
-                s.add(x >= 0, y >= 0)
-                min_w, min_h, _, _ = rooms[name]
-                w, h = min_w, min_h
-                s.add(x + w <= outer_width)
-                s.add(y + h <= outer_height)
-                for hole_x, hole_y, hole_width, hole_height in holes:
-                    s.add(
-                        Or(
-                            x + w <= hole_x,
-                            x >= hole_x + hole_width,
-                            y + h <= hole_y,
-                            y >= hole_y + hole_height,
-                        )
-                    )
-
-            # Re-add non-overlapping constraints
-            for name1, name2 in combinations(rooms.keys(), 2):
-                x1, y1 = positions[name1]
-                x2, y2 = positions[name2]
-                min_w1, min_h1, _, _ = rooms[name1]
-                min_w2, min_h2, _, _ = rooms[name2]
-                w1, h1 = min_w1, min_h1
-                w2, h2 = min_w2, min_h2
-
-
-                s.add(
-                    Or(
-                        x1 + w1 <= x2,
-                        x2 + w2 <= x1,
-                        y1 + h1 <= y2,
-                        y2 + h2 <= y1,
-                    )
-                )
+            s = z3.Solver()
+            add_base_constraints(s, positions, rooms, outer_width, outer_height, holes)
+            if symmetry_breaking:
+                add_symmetry_breaking(s, positions, rooms, edges, outer_width, outer_height, holes)
 
             # Add adjacency constraints except for the ones we're removing
             remaining_edges = [edge for edge in edges if edge not in edges_to_remove]
             for name1, name2 in remaining_edges:
-                x1, y1 = positions[name1]
-                x2, y2 = positions[name2]
-                min_w1, min_h1, _, _ = rooms[name1]
-                min_w2, min_h2, _, _ = rooms[name2]
-                w1, h1 = min_w1, min_h1
-                w2, h2 = min_w2, min_h2
-
-
-                left_of = And(
-                    x1 + w1 == x2,
-                    Or(
-                        And(y1 <= y2, y1 + h1 > y2),
-                        And(y2 <= y1, y2 + h2 > y1),
-                    ),
-                )
-
-                right_of = And(
-                    x2 + w2 == x1,
-                    Or(
-                        And(y1 <= y2, y1 + h1 > y2),
-                        And(y2 <= y1, y2 + h2 > y1),
-                    ),
-                )
-
-                above = And(
-                    y1 + h1 == y2,
-                    Or(
-                        And(x1 <= x2, x1 + w1 > x2),
-                        And(x2 <= x1, x2 + w2 > x1),
-                    ),
-                )
-
-                below = And(
-                    y2 + h2 == y1,
-                    Or(
-                        And(x1 <= x2, x1 + w1 > x2),
-                        And(x2 <= x1, x2 + w2 > x1),
-                    ),
-                )
-
-                s.add(Or(left_of, right_of, above, below))
+                s.add(edge_constraint(positions, rooms, name1, name2))
 
-            if s.check() == sat:
+            if budget.check(s) == z3.sat:
                 model = s.model()
-                initial_layout = {
-                    name: (model[x].as_long(), model[y].as_long())
-                    for name, (x, y) in positions.items()
-                }
+                initial_layout = layout_from_model(model, positions, rooms)
                 solution_end = time.time()
                 print(f"Solution found by removing {num_to_remove} adjacencies in", 
                       solution_end - solution_start, "seconds")
@@ -397,95 +1087,500 @@ def find_valid_solution(rooms, edges, outer_width, outer_height, holes, max_remo
     print("No valid layout found even after removing all adjacency constraints")
     return None, None
 
-def main():
-    global rooms, edges
-    outer_width, outer_height, holes, rooms_local, edges_local = get_user_boundary()
-    rooms = rooms_local
-    edges = edges_local
+def blocking_constraint(positions, layout, min_distance=1):
+    """
+    Constraint excluding `layout` and everything closer to it than `min_distance`,
+    measured as the total Manhattan distance the rooms' (x, y) move.
+    """
+    if min_distance <= 1:
+        return z3.Or([z3.Or(x != layout[name][0], y != layout[name][1]) for name, (x, y) in positions.items()])
+    moves = []
+    for name, (x, y) in positions.items():
+        x0, y0 = layout[name][:2]
+        moves.append(z3.If(x >= x0, x - x0, x0 - x))
+        moves.append(z3.If(y >= y0, y - y0, y0 - y))
+    return z3.Sum(moves) >= min_distance
 
-    initial_layout, used_edges = find_valid_solution(rooms, edges, outer_width, outer_height, holes)
-    
-    if initial_layout is None:
-        print("No valid layout found.")
+def enumerate_layouts(rooms, edges, outer_width, outer_height, holes, max_removals=None, min_distance=1,
+                      symmetry_breaking=True, budget=None):
+    """
+    Yield successive distinct (initial_layout, used_edges) solutions for one spec.
+
+    The adjacencies to keep are chosen once, as find_valid_solution(relaxation="core")
+    does, then the same solver is asked again after every layout with a
+    blocking_constraint added, so each further layout keeps everything the solver has
+    learnt so far. Every layout differs from all earlier ones by a total Manhattan
+    distance of at least `min_distance`. symmetry_breaking (on by default here) skips
+    relabellings and mirror images of layouts already yielded.
+    Stops when no further layout exists or `budget` runs out.
+    """
+    budget = budget or SolveBudget()
+    s, positions, edge_literals = build_guarded_model(
+        rooms, edges, outer_width, outer_height, holes, symmetry_breaking
+    )
+    try:
+        if budget.check(s, *edge_literals) == z3.sat:
+            kept = list(range(len(edges)))
+        else:
+            if max_removals is None:
+                max_removals = len(edges)
+            model, removal = relax_with_cores(
+                s, edge_literals, unsat_core_indices(s, edge_literals), max_removals, budget=budget
+            )
+            if model is None:
+                print("No valid layout found even after removing all adjacency constraints")
+                return
+            kept = [i for i in range(len(edges)) if i not in removal]
+        used_edges = [edges[i] for i in kept]
+        assumptions = [edge_literals[i] for i in kept]
+
+        count = 0
+        while budget.check(s, *assumptions) == z3.sat:
+            initial_layout = layout_from_model(s.model(), positions, rooms)
+            count += 1
+            yield initial_layout, list(used_edges)
+            s.add(blocking_constraint(positions, initial_layout, min_distance))
+    except SolveTimeout:
+        print("Time budget ran out while enumerating layouts")
         return
+    print(f"Enumerated all {count} layouts")
+
+# Solver configurations raced by find_valid_solution_portfolio, in launch order
+PORTFOLIO_CONFIGS = [
+    {"seed": 0, "options": {}},
+    {"seed": 1, "options": {"encoding": "bitvec"}},
+    {"seed": 2, "options": {"relaxation": "maxsmt"}},
+    {"seed": 3, "options": {"relaxation": "maxsmt", "encoding": "bitvec"}},
+    {"seed": 4, "options": {"symmetry_breaking": True}},
+    {"seed": 5, "options": {"symmetry_breaking": True, "encoding": "bitvec"}},
+    {"seed": 6, "options": {}},
+    {"seed": 7, "options": {"relaxation": "maxsmt", "symmetry_breaking": True}},
+]
+
+# Seconds the portfolio waits past its deadline for the workers to report their best layouts
+PORTFOLIO_GRACE = 1.0
+
+def portfolio_worker(index, config, spec, results):
+    """
+    Process entry point: solve `spec` with one configuration and report back on `results`
+    as (index, result, error, timed_out, best), best being the worker budget's
+    (best, best_rectangles).
+    """
+    z3.set_param("smt.random_seed", config.get("seed", 0))
+    z3.set_param("sat.random_seed", config.get("seed", 0))
+    options = config.get("options", {})
+    budget = options.get("budget") or SolveBudget()
+    options = {**options, "budget": budget}
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = find_valid_solution(*spec, **options)
+        results.put((index, result, None, False, (budget.best, budget.best_rectangles)))
+    except SolveTimeout as e:
+        results.put((index, None, repr(e), True, (budget.best, budget.best_rectangles)))
+    except Exception as e:
+        results.put((index, None, repr(e), False, (budget.best, budget.best_rectangles)))
+
+def find_valid_solution_portfolio(rooms, edges, outer_width, outer_height, holes, max_removals=None,
+                                  configs=None, workers=None, budget=None):
+    """
+    Race several solver configurations (seeds, encodings, relaxation modes) in separate
+    processes and return the first answer, terminating the others.
+
+    Every configuration answers the same question: the fewest removed adjacencies, at
+    most `max_removals`. The maxsmt ones get no edge weights, so they maximise the
+    number of kept adjacencies under the same cap (see add_removal_cap). Whichever
+    finishes first therefore gives a layout with the minimum number of removed
+    adjacencies, or proves there is none within the cap; configurations with
+    edge_weights would answer a different question and are rejected. Same return value
+    as find_valid_solution; raises SolveTimeout if `budget` runs out first, with the
+    best layout any worker found recorded on `budget`.
+    """
+    budget = budget or SolveBudget()
+    configs = list(configs or PORTFOLIO_CONFIGS)
+    if any(config.get("options", {}).get("edge_weights") for config in configs):
+        raise ValueError("Portfolio configurations cannot use edge_weights")
+    workers = min(len(configs), workers or os.cpu_count() or 1)
+    configs = configs[:workers]
+    spec = (rooms, edges, outer_width, outer_height, holes, max_removals)
+    configs = [
+        {**config, "options": {**config.get("options", {}), "budget": SolveBudget(budget.deadline)}}
+        for config in configs
+    ]
 
-    stretched_rectangles = compute_stretch(
-        initial_layout, rooms, used_edges, outer_width, outer_height, holes
-    )
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=portfolio_worker, args=(i, config, spec, results), daemon=True)
+        for i, config in enumerate(configs)
+    ]
+    solution_start = time.time()
+    for process in processes:
+        process.start()
+    try:
+        errors = []
+        timeouts = 0
+        while len(errors) < len(processes):
+            try:
+                index, result, error, timed_out, (best, best_rectangles) = results.get(timeout=0.1)
+            except queue.Empty:
+                if budget.cancelled:
+                    raise SolveTimeout("solve cancelled")
+                # The workers share the deadline, so give them a moment to hand back their best layouts
+                if budget.deadline is not None and time.time() >= budget.deadline + PORTFOLIO_GRACE:
+                    raise SolveTimeout("time budget exhausted")
+                if not any(process.is_alive() for process in processes) and results.empty():
+                    raise RuntimeError(f"Every portfolio worker exited without an answer: {errors}")
+                continue
+            if best is not None:
+                budget.record(*best, best_rectangles)
+            if error is not None:
+                errors.append(error)
+                timeouts += timed_out
+                continue
+            solution_end = time.time()
+            print(f"Portfolio config #{index} (seed {configs[index].get('seed', 0)}) finished first in",
+                  solution_end - solution_start, "seconds")
+            return result
+        if timeouts == len(errors) or budget.expired():
+            raise SolveTimeout("time budget exhausted")
+        raise RuntimeError(f"Every portfolio configuration failed: {errors}")
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+
+class LayoutSession:
+    """
+    Long-lived solver for re-solving an evolving spec, e.g. on every GUI submit.
+
+    The bounds/hole constraints of each room, the non-overlap constraint of each room
+    pair and each adjacency live in their own group, guarded by a tracking literal.
+    solve() diffs the new spec against the previous one: groups whose inputs changed
+    are retired (their literal is permanently disabled) and re-added, everything else
+    stays in the solver together with whatever it has learned. A change to the outer
+    boundary or the holes starts a fresh solver.
+
+    solve(warm_start=...) starts from a previous layout. If it is still a valid layout
+    of the new spec with every adjacency, it is returned without a solver call.
+    Otherwise rooms whose size did not change are pinned to their old positions by
+    assumptions: all at once when that works, or else released one at a time where they
+    stand in the way (see keep_soft) once the adjacencies to keep have been settled.
+    """
 
-    fig, ax = plt.subplots(figsize=(10, 8))
+    def __init__(self):
+        self.solver = None
+        self.boundary = None  # (outer_width, outer_height, holes) the solver was built for
+        self.rooms = {}  # name -> (min_w, min_h) currently encoded
+        self.positions = {}
+        self.room_literals = {}  # name -> literal
+        self.pair_literals = {}  # (name1, name2) -> literal
+        self.edge_literals = {}  # (name1, name2, occurrence) -> literal
+        self.retired = 0
+        self.generation = 0
+
+    def reset(self, outer_width, outer_height, holes):
+        self.solver = z3.Solver()
+        self.solver.set("core.minimize", True)
+        self.boundary = (outer_width, outer_height, [tuple(hole) for hole in holes])
+        self.rooms = {}
+        self.positions = {}
+        self.room_literals = {}
+        self.pair_literals = {}
+        self.edge_literals = {}
+        self.retired = 0
+
+    def new_literal(self, prefix):
+        self.generation += 1
+        return z3.Bool(f"{prefix}_{self.generation}")
+
+    def retire(self, literal):
+        self.solver.add(z3.Not(literal))
+        self.retired += 1
+
+    def guard(self, prefix, constraints):
+        literal = self.new_literal(prefix)
+        self.solver.add(z3.Implies(literal, z3.And(constraints)))
+        return literal
+
+    def pin(self, warm_start, rooms):
+        """
+        One assumption per room of `warm_start` (a Layout at min size) whose size did not
+        change, holding it at its old position. Being assumptions rather than guarded
+        constraints, they leave nothing behind in the solver.
+        """
+        pins = []
+        for name, (x0, y0, w0, h0) in warm_start.items():
+            if name in rooms and name in self.positions and tuple(rooms[name][:2]) == (w0, h0):
+                x, y = self.positions[name]
+                pins.append(z3.And(x == x0, y == y0))
+        return pins
+
+    def sync(self, rooms, edges, outer_width, outer_height, holes):
+        """Bring the encoded model in line with the given spec, touching only what changed."""
+        boundary = (outer_width, outer_height, [tuple(hole) for hole in holes])
+        live = len(self.room_literals) + len(self.pair_literals) + len(self.edge_literals)
+        # Retired groups stay in the solver as dead clauses, so start over once they dominate
+        if self.solver is None or boundary != self.boundary or self.retired > 4 * max(live, 1):
+            self.reset(outer_width, outer_height, holes)
+
+        new_sizes = {name: tuple(rooms[name][:2]) for name in rooms}
+        changed = {
+            name for name in set(self.rooms) | set(new_sizes)
+            if self.rooms.get(name) != new_sizes.get(name)
+        }
 
-    colors = [
-        "lightblue", "lightgreen", "lightcoral", "lightyellow", "lightpink",
-        "lightgrey", "lightsalmon", "lightcyan", "lightseagreen", "lightsteelblue",
-    ]
+        for name in changed:
+            if name in self.room_literals:
+                self.retire(self.room_literals.pop(name))
+        for key in [key for key in self.pair_literals if changed.intersection(key)]:
+            self.retire(self.pair_literals.pop(key))
+        for key in [key for key in self.edge_literals if changed.intersection(key[:2])]:
+            self.retire(self.edge_literals.pop(key))
+
+        self.rooms = new_sizes
+        for name in changed:
+            if name not in new_sizes:
+                self.positions.pop(name, None)
+                continue
+            x, y = self.positions.setdefault(name, (z3.Int(f"x_{name}"), z3.Int(f"y_{name}")))
+            min_w, min_h = new_sizes[name]
+            self.room_literals[name] = self.guard(
+                f"room_{name}", room_constraints(x, y, min_w, min_h, outer_width, outer_height, holes)
+            )
 
-    visualize_boundary(ax, outer_width, outer_height, holes)
+        for name1, name2 in combinations(new_sizes, 2):
+            key = tuple(sorted((name1, name2)))
+            if key in self.pair_literals:
+                continue
+            x1, y1 = self.positions[name1]
+            x2, y2 = self.positions[name2]
+            w1, h1 = new_sizes[name1]
+            w2, h2 = new_sizes[name2]
+            self.pair_literals[key] = self.guard(
+                f"pair_{name1}_{name2}", [non_overlap_constraint(x1, y1, w1, h1, x2, y2, w2, h2)]
+            )
 
-    for i, (name, (x, y, w, h)) in enumerate(stretched_rectangles.items()):
-            rect = patches.Rectangle(
-                (x, y),
-                w,
-                h,
-                linewidth=2,
-                edgecolor="black",
-                facecolor=colors[i % len(colors)],
+        # Repeated edges get their own literal so each occurrence can be dropped on its own
+        edge_keys = []
+        seen = {}
+        for name1, name2 in edges:
+            occurrence = seen.get((name1, name2), 0)
+            seen[(name1, name2)] = occurrence + 1
+            edge_keys.append((name1, name2, occurrence))
+        for key in [key for key in self.edge_literals if key not in set(edge_keys)]:
+            self.retire(self.edge_literals.pop(key))
+        for key in edge_keys:
+            if key not in self.edge_literals:
+                name1, name2, _ = key
+                self.edge_literals[key] = self.guard(
+                    f"adj_{name1}_{name2}",
+                    [edge_constraint(self.positions, rooms, name1, name2)],
+                )
+        return edge_keys
+
+    def keep_pins(self, budget, assumptions, pins):
+        """Model for the (satisfiable) `assumptions` keeping as many `pins` as possible."""
+        if not pins:
+            return self.solver.model()
+        kept = list(pins)
+        model = keep_soft(budget, self.solver, assumptions, kept)
+        print(f"Kept {len(kept)} of {len(pins)} unchanged rooms in place")
+        return model
+
+    def solve(self, rooms, edges, outer_width, outer_height, holes, max_removals=None, budget=None,
+              warm_start=None):
+        """
+        Same contract as find_valid_solution(relaxation="core"), reusing the live solver.
+        With `warm_start` (the previous initial_layout) unchanged rooms stay where they
+        were whenever that costs no adjacency.
+        """
+        budget = budget or SolveBudget()
+        solution_start = time.time()
+        edge_keys = self.sync(rooms, edges, outer_width, outer_height, holes)
+        pins = []
+        if warm_start is not None:
+            if layout_fits(warm_start, rooms, edges, outer_width, outer_height, holes):
+                # e.g. a dropped edge, a new max size or an unchanged spec: nothing to solve
+                print("Previous layout still holds every adjacency, keeping it")
+                return Layout.from_rects({name: warm_start[name] for name in rooms}), list(edges)
+            pins = self.pin(warm_start, rooms)
+
+        base_assumptions = list(self.room_literals.values()) + list(self.pair_literals.values())
+        edge_literals = [self.edge_literals[key] for key in edge_keys]
+        positions = {name: self.positions[name] for name in rooms}
+
+        s = self.solver
+        if pins and budget.check(s, *base_assumptions, *edge_literals, *pins) == z3.sat:
+            # The usual small edit: the old layout (plus the changed rooms) still works,
+            # settled in one check instead of a plain one followed by keep_pins
+            print(f"Kept all {len(pins)} unchanged rooms in place")
+            solution_end = time.time()
+            print("Solution found with all adjacencies in", solution_end - solution_start, "seconds")
+            return layout_from_model(s.model(), positions, rooms), list(edges)
+        if budget.check(s, *base_assumptions, *edge_literals) == z3.sat:
+            initial_layout = layout_from_model(self.keep_pins(budget, base_assumptions + edge_literals, pins),
+                                               positions, rooms)
+            solution_end = time.time()
+            print("Solution found with all adjacencies in", solution_end - solution_start, "seconds")
+            return initial_layout, list(edges)
+
+        print("No solution with all adjacencies, trying to remove some...")
+        core = unsat_core_indices(s, edge_literals)
+        record_fallback(budget, s, positions, rooms, edges, base_assumptions)
+        if max_removals is None:
+            max_removals = len(edges)
+        model, removal = relax_with_cores(s, edge_literals, core, max_removals, base_assumptions, budget)
+        if model is None:
+            print("No valid layout found even after removing all adjacency constraints")
+            return None, None
+        if pins:
+            kept_edges = [literal for i, literal in enumerate(edge_literals) if i not in removal]
+            model = self.keep_pins(budget, base_assumptions + kept_edges, pins)
+
+        initial_layout = layout_from_model(model, positions, rooms)
+        remaining_edges = [edge for i, edge in enumerate(edges) if i not in removal]
+        solution_end = time.time()
+        print(f"Solution found by removing {len(removal)} adjacencies in",
+              solution_end - solution_start, "seconds")
+        print("Removed adjacencies:", tuple(edges[i] for i in removal))
+        return initial_layout, remaining_edges
+
+def solve_layout(rooms, edges, outer_width, outer_height, holes, time_budget=None, session=None,
+                 cache=None, sizing="stretch", budget=None, warm_start=None, **options):
+    """
+    Full pipeline (placement, adjacency relaxation, stretch) under one wall-clock budget.
+
+    `time_budget` is in seconds (None for no limit); pass a SolveBudget as `budget`
+    instead to follow progress or cancel the solve from another thread. Placement goes
+    through `session` (a LayoutSession) when given, otherwise
+    find_valid_solution(**options); `warm_start`, the initial_layout of an earlier result,
+    makes the session start from it (see LayoutSession.solve). portfolio=True races
+    PORTFOLIO_CONFIGS on up to `workers` processes instead (find_valid_solution_portfolio,
+    which picks its own relaxation and encoding and takes no edge_weights). With a `cache`
+    (a GN_cache.LayoutCache) a spec already solved with the same RESULT_OPTIONS is
+    returned without solving.
+    sizing="stretch" places rooms at min size and grows them with compute_stretch,
+    "jump" does the same with compute_stretch(step="jump"), and
+    "area" or "walls" lets the solver pick the sizes too (find_sized_solution with that
+    objective), which skips the stretch and does not use `session`.
+    Returns a dict with:
+      status: "optimal" (every adjacency holds), "relaxed" (fewest adjacencies removed),
+              "timeout" (best layout found before the budget ran out, possibly None),
+              "cancelled" (likewise, after budget.cancel())
+              or "infeasible" (no layout even without adjacencies)
+      initial_layout, used_edges, removed_edges, rectangles (placed and final Layouts, or None)
+      timings: seconds spent in "solve" and "stretch"
+      cached: whether the result came from `cache`
+    """
+    if sizing not in ("stretch", "jump") and sizing not in SIZING_OBJECTIVES:
+        raise ValueError(f"Unknown sizing mode: {sizing}")
+    edge_weights = options.get("edge_weights")
+    if options.get("portfolio") and (edge_weights or options.get("backend", "z3") != "z3"):
+        raise ValueError("The portfolio only races z3 configurations without edge_weights")
+    cache_options = {
+        name: options[name] for name, default in RESULT_OPTIONS.items()
+        if options.get(name, default) != default
+    }
+    if cache is not None:
+        result = cache.get(rooms, edges, outer_width, outer_height, holes, edge_weights, sizing, cache_options)
+        if result is not None:
+            print("Layout loaded from cache")
+            return result
+
+    budget = budget or SolveBudget.from_seconds(time_budget)
+    result = {
+        "status": None, "initial_layout": None, "used_edges": None, "removed_edges": None,
+        "rectangles": None, "timings": {"solve": 0.0, "stretch": 0.0}, "cached": False,
+    }
+
+    rectangles = None
+    solve_start = time.time()
+    try:
+        if sizing in SIZING_OBJECTIVES:
+            rectangles, used_edges = find_sized_solution(
+                rooms, edges, outer_width, outer_height, holes, sizing, edge_weights,
+                options.get("symmetry_breaking", False), budget, options.get("max_removals"),
+            )
+            initial_layout = rectangles
+        elif session is not None:
+            initial_layout, used_edges = session.solve(
+                rooms, edges, outer_width, outer_height, holes,
+                options.get("max_removals"), budget, warm_start,
             )
-            ax.add_patch(rect)
-            # # Label at the center of the initial position
-            # # for some reason labelling at current midpt doesn't work???
-            # initial_x, initial_y = initial_layout[name]
-            # initial_w, initial_h = rooms[name]
-            # label_x = initial_x + initial_w / 2
-            # label_y = initial_y + initial_h / 2
-
-            # original_w, original_h = rooms[name]
-            # dimension_text = f"{original_w}x{original_h}"
-            # display_text = f"{name}\n{dimension_text}"
-
-            # ax.text(
-            #     label_x,
-            #     label_y,
-            #     display_text,
-            #     ha="center",
-            #     va="center",
-            #     fontsize=10,
-            #     fontweight="bold",
-            # )
-            
-            # Calculate center of the STRETCHED rectangle
-            stretched_center_x = x + w / 2
-            stretched_center_y = y + h / 2
-
-            # Create text using STRETCHED dimensions (w, h from loop)
-            dimension_text = f"{w}x{h}"
-            display_text = f"{name}\n{dimension_text}"
-
-            ax.text(
-                stretched_center_x, # Use stretched center X
-                stretched_center_y, # Use stretched center Y
-                display_text,       # Show name + stretched dimensions
-                ha="center",
-                va="center",
-                fontsize=10,
-                fontweight="bold",
+        elif options.get("portfolio"):
+            initial_layout, used_edges = find_valid_solution_portfolio(
+                rooms, edges, outer_width, outer_height, holes, options.get("max_removals"),
+                workers=options.get("workers"), budget=budget,
             )
+        else:
+            options.pop("portfolio", None)
+            initial_layout, used_edges = find_valid_solution(
+                rooms, edges, outer_width, outer_height, holes, budget=budget, **options
+            )
+        if initial_layout is None:
+            result["status"] = "infeasible"
+        else:
+            result["status"] = "optimal" if len(used_edges) == len(edges) else "relaxed"
+    except SolveTimeout:
+        if budget.cancelled:
+            print("Solve cancelled, returning the best layout found so far")
+            result["status"] = "cancelled"
+        else:
+            print("Time budget ran out, returning the best layout found so far")
+            result["status"] = "timeout"
+        initial_layout, used_edges = budget.best or (None, None)
+        rectangles = budget.best_rectangles
+    result["timings"]["solve"] = time.time() - solve_start
+
+    if initial_layout is None:
+        if cache is not None:
+            cache.put(rooms, edges, outer_width, outer_height, holes, result, edge_weights, sizing,
+                      cache_options)
+        return result
+
+    result["initial_layout"] = initial_layout
+    result["used_edges"] = list(used_edges)
+    remaining = list(used_edges)
+    removed_edges = []
+    for edge in edges:
+        if edge in remaining:
+            remaining.remove(edge)
+        else:
+            removed_edges.append(edge)
+    result["removed_edges"] = removed_edges
+
+    if rectangles is not None:
+        result["rectangles"] = rectangles
+    else:
+        stretch_start = time.time()
+        result["rectangles"] = compute_stretch(
+            initial_layout, rooms, used_edges, outer_width, outer_height, holes, budget,
+            step="jump" if sizing == "jump" else "unit",
+        )
+        result["timings"]["stretch"] = time.time() - stretch_start
+    if budget.cancelled:
+        result["status"] = "cancelled"
+    elif budget.expired():
+        result["status"] = "timeout"
+    if cache is not None:
+        cache.put(rooms, edges, outer_width, outer_height, holes, result, edge_weights, sizing, cache_options)
+    return result
 
-    ax.grid(True, linestyle="--", alpha=0.7)
-    ax.set_aspect("equal")
-    ax.set_xlim(-0.5, outer_width + 0.5)
-    ax.set_ylim(-0.5, outer_height + 0.5)
-    ax.set_title("Room Layout Solution")
-    ax.set_xlabel("X-coordinate")
-    ax.set_ylabel("Y-coordinate")
+def main():
+    global rooms, edges
+    outer_width, outer_height, holes, rooms_local, edges_local = get_user_boundary()
+    rooms = rooms_local
+    edges = edges_local
 
-    for i in range(outer_width + 1):
-        ax.text(i, -0.25, str(i), ha="center")
-    for i in range(outer_height + 1):
-        ax.text(-0.25, i, str(i), ha="center")
+    result = solve_layout(rooms, edges, outer_width, outer_height, holes, cache=LayoutCache())
+    
+    if result["rectangles"] is None:
+        print("No valid layout found.")
+        return
 
-    plt.tight_layout()
-    plt.show()
+    from GN_plot import plot_layout  # matplotlib is only needed once there is something to draw
+    plot_layout(result["rectangles"], outer_width, outer_height, holes)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,241 @@
+"""
+Headless batch solving of saved specs.
+
+Usage: python GN_batch.py SPEC [SPEC ...] [--workers N] [--output results.jsonl]
+                          [--time-budget SECONDS] [--sizing MODE] [--backend NAME] [--cache DIR]
+
+Each SPEC is a JSON file in the last_input.json schema (as saved by GN_guitrial), a
+directory of them or a glob. Specs are solved across a pool of worker processes and
+every result is written as one JSON line as soon as it finishes, so an interrupted run
+keeps everything it completed.
+
+iter_solve is the library-level equivalent for streams of specs, e.g. a JSONL file
+handle: results are yielded lazily as they complete, with only a bounded number of
+specs read ahead, so memory stays flat however long the stream is.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from GN_assignment import SIZING_OBJECTIVES, solve_layout, terminate_executor
+from GN_cache import LayoutCache
+
+
+def spec_paths(arguments):
+    """Expand files, directories (every *.json inside) and glob patterns, in order and without repeats."""
+    paths = []
+    for argument in arguments:
+        if os.path.isdir(argument):
+            matches = sorted(glob.glob(os.path.join(argument, "*.json")))
+        elif os.path.exists(argument):
+            matches = [argument]
+        else:
+            matches = sorted(glob.glob(argument, recursive=True))
+            if not matches:
+                print(f"No spec files match '{argument}'", file=sys.stderr)
+        paths.extend(matches)
+    return list(dict.fromkeys(paths))
+
+
+def spec_from_json(entry):
+    """
+    Solver arguments from a last_input.json style dict: rooms {name: [min_w, min_h, max_w, max_h]},
+    edges [[a, b], ...], outer_width, outer_height, holes [[x, y, w, h], ...] and optionally
+    edge_weights [[a, b, weight], ...]. Returns (rooms, edges, outer_width, outer_height, holes, edge_weights).
+    """
+    rooms = {name: tuple(int(v) for v in dims) for name, dims in entry["rooms"].items()}
+    edges = [(name1, name2) for name1, name2 in entry.get("edges", [])]
+    holes = [tuple(int(v) for v in hole) for hole in entry.get("holes", [])]
+    edge_weights = {(name1, name2): weight for name1, name2, weight in entry.get("edge_weights", [])}
+    return rooms, edges, int(entry["outer_width"]), int(entry["outer_height"]), holes, edge_weights or None
+
+
+def result_line(spec_id, result):
+    """JSON-ready summary of a solve_layout result for the spec `spec_id`."""
+    rectangles = result["rectangles"]
+    return {
+        "spec": spec_id,
+        "status": result["status"],
+        "layout": {name: list(rect) for name, rect in rectangles.items()} if rectangles is not None else None,
+        "used_edges": [list(edge) for edge in result["used_edges"]] if result["used_edges"] is not None else None,
+        "removed_edges": (
+            [list(edge) for edge in result["removed_edges"]] if result["removed_edges"] is not None else None
+        ),
+        "timings": result["timings"],
+        "cached": result["cached"],
+    }
+
+
+def error_line(spec_id, error, start):
+    return {
+        "spec": spec_id, "status": "error", "error": f"{type(error).__name__}: {error}",
+        "traceback": traceback.format_exc(), "timings": {"total": time.time() - start},
+    }
+
+
+def solve_spec(spec_id, entry, time_budget=None, sizing="stretch", cache_dir=None, **options):
+    """
+    Worker entry point: solve one last_input.json style spec with the solver's progress
+    prints silenced and return its result_line. Never raises; a spec that cannot be
+    solved gives status "error".
+    """
+    start = time.time()
+    try:
+        rooms, edges, outer_width, outer_height, holes, edge_weights = spec_from_json(entry)
+        if edge_weights:
+            options = dict(options, relaxation="maxsmt", edge_weights=edge_weights)
+        cache = LayoutCache(cache_dir) if cache_dir else None
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = solve_layout(rooms, edges, outer_width, outer_height, holes, time_budget,
+                                  cache=cache, sizing=sizing, **options)
+        return result_line(spec_id, result)
+    except Exception as e:
+        return error_line(spec_id, e, start)
+
+
+def solve_spec_file(path, **options):
+    """solve_spec for the spec saved at `path`, reading it in the worker."""
+    start = time.time()
+    try:
+        with open(path, "r") as f:
+            entry = json.load(f)
+    except Exception as e:
+        return error_line(path, e, start)
+    return solve_spec(path, entry, **options)
+
+
+def bounded_map(function, jobs, workers=None, max_in_flight=None, on_lost=None):
+    """
+    Run function(*job) for every job on a process pool, yielding results in completion
+    order. At most `max_in_flight` jobs (default twice the worker count) are taken from
+    `jobs` ahead of the consumer, so `jobs` can be an unbounded iterator. When the
+    consumer stops early the workers are terminated, solves in progress included.
+
+    A worker that dies (crash, OOM kill) breaks the pool and every job in flight with it.
+    Those jobs are rerun one at a time on a fresh pool; the one that still kills its
+    worker is lost and on_lost(job, error) is yielded in its place (without on_lost the
+    BrokenProcessPool error is raised).
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    max_in_flight = max(1, max_in_flight or 2 * workers)
+    jobs = iter(jobs)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = {}  # future -> job
+    suspects = []  # jobs in flight when a worker died, rerun alone to find the lost one
+    try:
+        while True:
+            if suspects:
+                job = suspects.pop(0)
+                try:
+                    result = executor.submit(function, *job).result()
+                except BrokenProcessPool as e:
+                    result = on_lost(job, e)
+                    terminate_executor(executor)
+                    executor = ProcessPoolExecutor(max_workers=workers)
+                yield result
+                continue
+            for job in jobs:
+                pending[executor.submit(function, *job)] = job
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = pending.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    if on_lost is None:
+                        raise
+                    suspects.append(job)
+                    continue
+                yield result
+            if suspects:
+                # The broken pool fails everything still in flight too
+                suspects.extend(pending.values())
+                pending.clear()
+                terminate_executor(executor)
+                executor = ProcessPoolExecutor(max_workers=workers)
+    finally:
+        # Also reached when the consumer stops early: stop the work nobody will read
+        terminate_executor(executor)
+
+
+def lost_line(job, error):
+    """error_line for a (spec_id, ...) job whose worker process died before returning."""
+    return error_line(job[0], error, time.time())
+
+
+def iter_solve(specs, workers=None, max_in_flight=None, **options):
+    """
+    Solve a stream of specs on `workers` processes, yielding result_line dicts as they
+    complete (not in input order).
+
+    `specs` is any iterable of last_input.json style dicts, or of JSON lines such as an
+    open JSONL file; blank lines are skipped. Each result's "spec" is the spec's "id"
+    field, or its index among the specs when it has none. At most `max_in_flight`
+    specs are held at once. Remaining keyword arguments go to solve_layout as in
+    solve_spec (time_budget, sizing, cache_dir, backend, ...). A spec whose worker
+    process dies gives status "error" like any other failed spec.
+    """
+    def jobs():
+        index = 0
+        for item in specs:
+            if isinstance(item, (str, bytes)):
+                if not item.strip():
+                    continue
+                item = json.loads(item)
+            yield item.get("id", index), item
+            index += 1
+
+    yield from bounded_map(partial(solve_spec, **options), jobs(), workers, max_in_flight, on_lost=lost_line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve saved floor plan specs in parallel.")
+    parser.add_argument("specs", nargs="+", help="spec files, directories of specs or glob patterns")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: CPU count)")
+    parser.add_argument("--output", default="-", help="JSONL file to write results to (default: stdout)")
+    parser.add_argument("--time-budget", type=float, default=None, help="seconds allowed per spec")
+    parser.add_argument("--sizing", default="stretch", choices=("stretch", "jump") + SIZING_OBJECTIVES)
+    parser.add_argument("--backend", default="z3", choices=("z3", "grid"))
+    parser.add_argument("--cache", default=None, metavar="DIR", help="reuse and fill a layout cache directory")
+    args = parser.parse_args(argv)
+
+    paths = spec_paths(args.specs)
+    if not paths:
+        print("No specs to solve", file=sys.stderr)
+        return 1
+
+    options = {"time_budget": args.time_budget, "sizing": args.sizing, "cache_dir": args.cache,
+               "backend": args.backend}
+    counts = {}
+    start = time.time()
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        jobs = ((path,) for path in paths)
+        for line in bounded_map(partial(solve_spec_file, **options), jobs, args.workers, on_lost=lost_line):
+            counts[line["status"]] = counts.get(line["status"], 0) + 1
+            output.write(json.dumps(line) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items(), key=lambda item: str(item[0])))
+    print(f"Solved {len(paths)} specs in {time.time() - start:.1f} seconds: {summary}", file=sys.stderr)
+    return 1 if counts.get("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
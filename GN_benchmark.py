@@ -0,0 +1,396 @@
+"""
+Timing benchmarks for the layout solver.
+
+Usage: python GN_benchmark.py [benchmark ...]   (runs every benchmark if none given)
+
+"differential" and "weighted_symmetry" are correctness checks rather than timings:
+they exit non-zero when the grid backend and z3 disagree on a random spec, or when
+symmetry breaking changes a weighted optimum. "portfolio" likewise fails when the
+portfolio and the single configuration keep different numbers of adjacencies.
+"""
+import contextlib
+import io
+import os
+import random
+import subprocess
+import sys
+import time
+from itertools import islice
+
+from z3 import sat
+
+from GN_assignment import (
+    blocking_constraint, build_guarded_model, compute_stretch, compute_stretch_batch, enumerate_layouts,
+    find_valid_solution, solve_layout,
+)
+
+
+def timed(function, *args, repeats=3, **kwargs):
+    """Best wall-clock time of `repeats` calls with the solver's progress prints silenced."""
+    best = None
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = function(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def plan_spec(x_scale=1, y_scale=1):
+    """The 8-room apartment from last_input.json on its 20x25 grid, optionally scaled up."""
+    rooms = {
+        "A": (8, 8), "B": (5, 8), "C": (5, 5), "D": (9, 6),
+        "E": (3, 2), "F": (3, 4), "G": (4, 4), "H": (8, 8),
+    }
+    outer_width, outer_height = 20 * x_scale, 25 * y_scale
+    rooms = {
+        name: (w * x_scale, h * y_scale, outer_width, outer_height)
+        for name, (w, h) in rooms.items()
+    }
+    edges = [("D", "E"), ("D", "G"), ("D", "B"), ("D", "C"),
+             ("B", "C"), ("A", "H"), ("F", "H"), ("C", "A")]
+    holes = [(10 * x_scale, 10 * y_scale, 10 * x_scale, 15 * y_scale)]
+    return rooms, edges, outer_width, outer_height, holes
+
+
+def open_plan_spec():
+    """The 8-room plan without the Living-Dining edge: feasible with every adjacency."""
+    rooms, edges, outer_width, outer_height, holes = plan_spec()
+    return rooms, [edge for edge in edges if edge != ("D", "C")], outer_width, outer_height, holes
+
+
+def site_spec():
+    """The same plan stretched onto a 100x100 site grid."""
+    return plan_spec(x_scale=5, y_scale=4)
+
+
+# Infeasible specs: the solver has to refute every equivalent placement
+def hub_spec():
+    """A 2x2 hall that six identical bedrooms must all touch: two adjacencies have to go."""
+    rooms = {"X": (2, 2, 12, 12)}
+    for name in "ABCDEF":
+        rooms[name] = (3, 3, 12, 12)
+    edges = [("X", name) for name in "ABCDEF"]
+    return rooms, edges, 12, 12, []
+
+
+def packing_spec():
+    """Seven identical 3x3 rooms in a 10x7 plot: no layout exists at all."""
+    rooms = {name: (3, 3, 10, 7) for name in "ABCDEFG"}
+    return rooms, [], 10, 7, []
+
+
+def campus_layout(columns=6, rows=6, spacing=20):
+    """
+    A stretch workload: columns x rows rooms placed at 4x4 on a grid with `spacing`
+    between origins, each free to grow to 3 * spacing, with corridor edges between
+    horizontal neighbours and a courtyard hole in the middle.
+    Returns (initial_layout, rooms, edges, outer_width, outer_height, holes).
+    """
+    outer_width, outer_height = columns * spacing, rows * spacing
+    rooms, initial_layout, edges = {}, {}, []
+    holes = [(outer_width // 2 - spacing // 2, outer_height // 2 - spacing // 2, 4, 4)]
+    for row in range(rows):
+        for column in range(columns):
+            name = f"R{row}_{column}"
+            rooms[name] = (4, 4, 3 * spacing, 3 * spacing)
+            initial_layout[name] = (column * spacing + 1, row * spacing + 1)
+            if column > 0:
+                edges.append((f"R{row}_{column - 1}", name))
+    return initial_layout, rooms, edges, outer_width, outer_height, holes
+
+
+def campus_variants(count, columns=6, rows=6, spacing=20, seed=0):
+    """
+    `count` initial layouts of the campus spec, each room moved to a random spot in its
+    own spacing x spacing cell (clear of the courtyard).
+    Returns (layouts, rooms, edges, outer_width, outer_height, holes), layouts being a
+    list of [(x, y, w, h), ...] in `rooms` order.
+    """
+    initial_layout, rooms, edges, outer_width, outer_height, holes = campus_layout(columns, rows, spacing)
+    (hole_x, hole_y, hole_width, hole_height), = holes
+    rng = random.Random(seed)
+    layouts = []
+    for _ in range(count):
+        layout = []
+        for name, (x, y) in initial_layout.items():
+            w, h = rooms[name][:2]
+            cell_x, cell_y = x - x % spacing, y - y % spacing
+            x, y = cell_x + rng.randint(0, spacing - w), cell_y + rng.randint(0, spacing - h)
+            if x < hole_x + hole_width and hole_x < x + w and y < hole_y + hole_height and hole_y < y + h:
+                x, y = initial_layout[name]
+            layout.append((x, y, w, h))
+        layouts.append(layout)
+    return layouts, rooms, edges, outer_width, outer_height, holes
+
+
+def benchmark_batch():
+    print(f"{'rooms':>6}{'layouts':>9}{'loop (s)':>10}{'batch (s)':>11}")
+    for size, count in ((4, 50), (6, 200)):
+        layouts, rooms, edges, outer_width, outer_height, holes = campus_variants(count, size, size)
+        names = list(rooms)
+
+        def stretch_each():
+            return [
+                compute_stretch({name: rect[:2] for name, rect in zip(names, layout)},
+                                rooms, edges, outer_width, outer_height, holes)
+                for layout in layouts
+            ]
+
+        loop_time, _ = timed(stretch_each, repeats=1)
+        batch_time, _ = timed(compute_stretch_batch, layouts, rooms, edges, outer_width, outer_height, holes,
+                              repeats=1)
+        print(f"{len(rooms):>6}{count:>9}{loop_time:>10.3f}{batch_time:>11.3f}")
+
+
+def benchmark_stretch():
+    print(f"{'rooms':>6}{'plot':>10}{'unit (s)':>10}{'jump (s)':>10}")
+    for size, spacing in ((4, 20), (8, 20), (12, 20), (8, 80)):
+        initial_layout, rooms, edges, outer_width, outer_height, holes = campus_layout(size, size, spacing)
+        times = []
+        for step in ("unit", "jump"):
+            elapsed, _ = timed(
+                compute_stretch, initial_layout, rooms, edges, outer_width, outer_height, holes, step=step
+            )
+            times.append(elapsed)
+        print(f"{len(rooms):>6}{f'{outer_width}x{outer_height}':>10}{times[0]:>10.3f}{times[1]:>10.3f}")
+
+
+def benchmark_symmetry():
+    print(f"{'spec':<14}{'relaxation':<12}{'plain (s)':>12}{'sym-break (s)':>15}{'speedup':>10}")
+    for spec in (hub_spec, packing_spec):
+        rooms, edges, outer_width, outer_height, holes = spec()
+        for relaxation in ("core", "subsets"):
+            times = []
+            for symmetry_breaking in (False, True):
+                elapsed, _ = timed(
+                    find_valid_solution, rooms, edges, outer_width, outer_height, holes,
+                    relaxation=relaxation, symmetry_breaking=symmetry_breaking,
+                )
+                times.append(elapsed)
+            print(f"{spec.__name__:<14}{relaxation:<12}{times[0]:>12.3f}{times[1]:>15.3f}"
+                  f"{times[0] / times[1]:>9.1f}x")
+
+
+def benchmark_encoding():
+    print(f"{'spec':<14}{'relaxation':<12}{'int (s)':>10}{'bitvec (s)':>12}")
+    for spec in (plan_spec, site_spec):
+        rooms, edges, outer_width, outer_height, holes = spec()
+        for relaxation in ("core", "maxsmt"):
+            times = []
+            for encoding in ("int", "bitvec"):
+                elapsed, _ = timed(
+                    find_valid_solution, rooms, edges, outer_width, outer_height, holes,
+                    relaxation=relaxation, encoding=encoding,
+                )
+                times.append(elapsed)
+            print(f"{spec.__name__:<14}{relaxation:<12}{times[0]:>10.3f}{times[1]:>12.3f}")
+
+
+def benchmark_backend():
+    print(f"{'spec':<16}{'z3 core (s)':>13}{'z3 subsets (s)':>16}{'grid (s)':>10}")
+    for spec in (open_plan_spec, plan_spec, hub_spec):
+        rooms, edges, outer_width, outer_height, holes = spec()
+        times = []
+        for options in ({}, {"relaxation": "subsets"}, {"backend": "grid"}):
+            elapsed, _ = timed(
+                find_valid_solution, rooms, edges, outer_width, outer_height, holes, **options
+            )
+            times.append(elapsed)
+        print(f"{spec.__name__:<16}{times[0]:>13.3f}{times[1]:>16.3f}{times[2]:>10.3f}")
+
+
+def benchmark_sizing():
+    print(f"{'spec':<16}{'sizing':<10}{'time (s)':>10}{'adjacencies':>13}{'area':>7}")
+    for spec in (open_plan_spec, plan_spec, hub_spec):
+        rooms, edges, outer_width, outer_height, holes = spec()
+        for sizing in ("stretch", "jump", "area", "walls"):
+            elapsed, result = timed(
+                solve_layout, rooms, edges, outer_width, outer_height, holes, time_budget=60, sizing=sizing
+            )
+            area = sum(w * h for _, _, w, h in result["rectangles"].values())
+            print(f"{spec.__name__:<16}{sizing:<10}{elapsed:>10.3f}"
+                  f"{len(result['used_edges']):>8}/{len(edges):<4}{area:>7}")
+
+
+def cold_layouts(rooms, edges, used_edges, outer_width, outer_height, holes, count, min_distance):
+    """As many layouts as enumerate_layouts, rebuilding the solver and every blocking constraint each time."""
+    layouts = []
+    for _ in range(count):
+        s, positions, edge_literals = build_guarded_model(
+            rooms, edges, outer_width, outer_height, holes, symmetry_breaking=True
+        )
+        for layout in layouts:
+            s.add(blocking_constraint(positions, layout, min_distance))
+        if s.check(*[literal for literal, edge in zip(edge_literals, edges) if edge in used_edges]) != sat:
+            break
+        model = s.model()
+        layouts.append({name: (model[x].as_long(), model[y].as_long()) for name, (x, y) in positions.items()})
+    return layouts
+
+
+def benchmark_enumerate():
+    print(f"{'spec':<16}{'layouts':>8}{'min dist':>10}{'incremental (s)':>17}{'cold (s)':>10}")
+    for spec in (open_plan_spec, site_spec):
+        rooms, edges, outer_width, outer_height, holes = spec()
+        for count, min_distance in ((20, 1), (20, 10)):
+            incremental_time, layouts = timed(
+                lambda: list(islice(enumerate_layouts(
+                    rooms, edges, outer_width, outer_height, holes, min_distance=min_distance,
+                ), count)),
+                repeats=1,
+            )
+            used_edges = layouts[0][1]
+            cold_time, _ = timed(cold_layouts, rooms, edges, used_edges, outer_width, outer_height, holes,
+                                 len(layouts), min_distance, repeats=1)
+            print(f"{spec.__name__:<16}{len(layouts):>8}{min_distance:>10}{incremental_time:>17.3f}"
+                  f"{cold_time:>10.3f}")
+
+
+def random_spec(rng):
+    """A small, tightly packed random spec (2-4 rooms, up to two 1x1 holes, maybe some edges)."""
+    outer_width, outer_height = rng.randint(2, 5), rng.randint(2, 5)
+    rooms = {}
+    for name in "ABCD"[:rng.randint(2, 4)]:
+        w, h = rng.randint(1, 3), rng.randint(1, 3)
+        rooms[name] = (w, h, w, h)
+    holes = [
+        (rng.randint(0, outer_width - 1), rng.randint(0, outer_height - 1), 1, 1)
+        for _ in range(rng.randint(0, 2))
+    ]
+    pairs = [(name1, name2) for i, name1 in enumerate(rooms) for name2 in list(rooms)[i + 1:]]
+    edges = [pair for pair in pairs if rng.random() < 0.4] if rng.random() < 0.5 else []
+    return rooms, edges, outer_width, outer_height, holes
+
+
+def benchmark_differential(count=300, seed=0):
+    # Not a timing: the grid backend must keep exactly as many adjacencies as the z3
+    # subset search (or agree that no layout exists) on every random spec
+    rng = random.Random(seed)
+    mismatches = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        spec = random_spec(rng)
+        kept = []
+        for options in ({"relaxation": "subsets"}, {"backend": "grid"}):
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, used_edges = find_valid_solution(*spec, **options)
+            kept.append(None if used_edges is None else len(used_edges))
+        if kept[0] != kept[1]:
+            mismatches += 1
+            print(f"mismatch: z3 kept {kept[0]}, grid kept {kept[1]} for {spec}")
+    print(f"{count} random specs, {mismatches} mismatches ({time.perf_counter() - start:.1f}s)")
+    return mismatches == 0
+
+
+def weighted_swap_spec():
+    """A and B are alike but their edges to X weigh 1 and 10, and only one of them can touch X."""
+    rooms = {"X": (1, 1, 7, 3), "A": (3, 3, 7, 3), "B": (3, 3, 7, 3)}
+    edges = [("X", "A"), ("X", "B")]
+    edge_weights = {("X", "A"): 1, ("X", "B"): 10}
+    return rooms, edges, 7, 3, [(0, 1, 1, 2)], edge_weights
+
+
+def benchmark_weighted_symmetry():
+    # Not a timing: symmetry breaking must not cost the weighted optimum, so every
+    # weighted mode keeps the heavier X-B edge with and without it
+    rooms, edges, outer_width, outer_height, holes, edge_weights = weighted_swap_spec()
+    failures = 0
+    for sizing in ("stretch", "area"):
+        for symmetry_breaking in (False, True):
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = solve_layout(rooms, edges, outer_width, outer_height, holes, sizing=sizing,
+                                      relaxation="maxsmt", edge_weights=edge_weights,
+                                      symmetry_breaking=symmetry_breaking)
+            kept = result["used_edges"]
+            failures += kept != [("X", "B")]
+            print(f"sizing={sizing:<8} symmetry_breaking={symmetry_breaking!s:<6} kept {kept}")
+    return failures == 0
+
+
+def percentile(times, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    return times[min(len(times) - 1, int(fraction * len(times)))]
+
+
+def benchmark_portfolio(runs=3):
+    # Racing PORTFOLIO_CONFIGS trades CPU for a shorter worst case: compare the latency
+    # spread with the single default configuration. Both keep the fewest possible
+    # removals, so their adjacency counts must agree
+    workers = os.cpu_count() or 1
+    specs = (open_plan_spec, plan_spec, site_spec, hub_spec, packing_spec)
+    print(f"{len(specs)} specs x {runs} runs, portfolio on {workers} workers")
+    print(f"{'solver':<12}{'median (s)':>12}{'p90 (s)':>10}{'max (s)':>10}")
+    kept = {}
+    for label, options in (("single", {}), ("portfolio", {"portfolio": True, "workers": workers})):
+        times = []
+        for spec in specs:
+            for _ in range(runs):
+                elapsed, result = timed(solve_layout, *spec(), repeats=1, **options)
+                times.append(elapsed)
+                used_edges = result["used_edges"]
+                kept.setdefault(spec.__name__, set()).add(None if used_edges is None else len(used_edges))
+        times.sort()
+        print(f"{label:<12}{percentile(times, 0.5):>12.3f}{percentile(times, 0.9):>10.3f}{times[-1]:>10.3f}")
+    mismatches = [name for name, counts in kept.items() if len(counts) > 1]
+    for name in mismatches:
+        print(f"mismatch: {name} kept {sorted(kept[name], key=str)} adjacencies")
+    return not mismatches
+
+
+IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in ("z3", "matplotlib", "numpy") if any(loaded.startswith(name + ".") for loaded in sys.modules)]
+print(elapsed, ",".join(heavy) or "-")
+"""
+
+
+def benchmark_imports():
+    # Each import runs in a fresh interpreter so nothing is already loaded. A package
+    # counts as loaded once any of its submodules is: a lazy import only registers the
+    # top-level module
+    print(f"{'module':<16}{'import (s)':>12}  heavy modules loaded")
+    for module in ("GN_geometry", "GN_grid", "GN_assignment", "GN_batch", "GN_plot"):
+        times, heavy = [], ""
+        for _ in range(3):
+            output = subprocess.run([sys.executable, "-c", IMPORT_PROBE.format(module=module)],
+                                    capture_output=True, text=True, check=True).stdout.split()
+            times.append(float(output[0]))
+            heavy = output[1]
+        print(f"{module:<16}{min(times):>12.3f}  {heavy}")
+
+
+BENCHMARKS = {
+    "symmetry": benchmark_symmetry,
+    "encoding": benchmark_encoding,
+    "backend": benchmark_backend,
+    "differential": benchmark_differential,
+    "weighted_symmetry": benchmark_weighted_symmetry,
+    "portfolio": benchmark_portfolio,
+    "sizing": benchmark_sizing,
+    "stretch": benchmark_stretch,
+    "batch": benchmark_batch,
+    "enumerate": benchmark_enumerate,
+    "imports": benchmark_imports,
+}
+
+
+def main(names):
+    status = 0
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}', choose from: {', '.join(BENCHMARKS)}")
+            return 1
+        print(f"== {name} ==")
+        if BENCHMARKS[name]() is False:  # checks such as "differential" report failure
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,137 @@
+"""
+Content-addressed on-disk cache of solved layouts.
+
+Entries are keyed by a hash of the spec (rooms, edges, boundary, holes and edge
+priorities, plus any solver options that change the result) that ignores edge order,
+edge orientation ("A B" vs "B A") and hole order, so resubmitting the same plan is a
+file read instead of a solve.
+"""
+import hashlib
+import json
+import os
+from collections import Counter
+
+from GN_geometry import Layout
+
+DEFAULT_CACHE_DIR = ".layout_cache"
+ENTRY_FORMAT = 3  # bumped when the stored layout encoding or the key changes; older entries read as misses
+
+
+def canonical_edge(edge):
+    name1, name2 = edge
+    return tuple(sorted((name1, name2)))
+
+
+def spec_key(rooms, edges, outer_width, outer_height, holes, edge_weights=None, sizing="stretch",
+             options=None):
+    """
+    Hex digest identifying a spec, sizing mode and the solver `options` that change its
+    result (e.g. {"max_removals": 1}), up to edge order/orientation and hole order.
+    """
+    weights = {}
+    for edge, weight in (edge_weights or {}).items():
+        weights[canonical_edge(edge)] = weight
+    spec = {
+        "rooms": sorted([name, [int(v) for v in dims]] for name, dims in rooms.items()),
+        "edges": sorted(canonical_edge(edge) for edge in edges),
+        "outer": [int(outer_width), int(outer_height)],
+        "holes": sorted([int(v) for v in hole] for hole in holes),
+        "weights": sorted([list(edge), weight] for edge, weight in weights.items()),
+    }
+    if sizing != "stretch":
+        spec["sizing"] = sizing  # left out for the default so existing entries stay valid
+    if options:
+        spec["options"] = dict(options)
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+class LayoutCache:
+    """
+    Directory of JSON entries, one per spec key, holding the solve_layout result.
+    Reads refresh an entry's modification time and writes evict the least recently
+    used entries beyond `max_entries`.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_entries=256):
+        self.directory = directory
+        self.max_entries = max_entries
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, rooms, edges, outer_width, outer_height, holes, edge_weights=None, sizing="stretch",
+            options=None):
+        """Return the cached solve_layout result for this spec (edges in the caller's orientation), or None."""
+        path = self.path(spec_key(rooms, edges, outer_width, outer_height, holes, edge_weights, sizing, options))
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            return None
+        if entry.get("format") != ENTRY_FORMAT:
+            return None
+
+        # Map the stored canonical edges back onto the caller's edge list
+        used_counts = Counter(canonical_edge(edge) for edge in entry["used_edges"] or [])
+        used_edges, removed_edges = [], []
+        for edge in edges:
+            if used_counts[canonical_edge(edge)] > 0:
+                used_counts[canonical_edge(edge)] -= 1
+                used_edges.append(tuple(edge))
+            else:
+                removed_edges.append(tuple(edge))
+
+        solved = entry["initial_layout"] is not None
+        return {
+            "status": entry["status"],
+            "initial_layout": Layout.from_json(entry["initial_layout"]) if solved else None,
+            "used_edges": used_edges if solved else None,
+            "removed_edges": removed_edges if solved else None,
+            "rectangles": Layout.from_json(entry["rectangles"]) if solved else None,
+            "timings": {"solve": 0.0, "stretch": 0.0},
+            "cached": True,
+        }
+
+    def put(self, rooms, edges, outer_width, outer_height, holes, result, edge_weights=None,
+            sizing="stretch", options=None):
+        """
+        Store a solve_layout result. Timed-out or cancelled results are not final, nor is
+        "infeasible" from a solve with max_removals capped, so those are skipped.
+        """
+        if result["status"] in ("timeout", "cancelled"):
+            return
+        if result["status"] == "infeasible" and (options or {}).get("max_removals") is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        key = spec_key(rooms, edges, outer_width, outer_height, holes, edge_weights, sizing, options)
+        solved = result["initial_layout"] is not None
+        entry = {
+            "format": ENTRY_FORMAT,
+            "status": result["status"],
+            "initial_layout": result["initial_layout"].to_json() if solved else None,
+            "used_edges": [canonical_edge(edge) for edge in result["used_edges"] or []],
+            "rectangles": result["rectangles"].to_json() if solved else None,
+        }
+        temp_path = self.path(key) + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(temp_path, self.path(key))
+        self.evict()
+
+    def evict(self):
+        """Drop the least recently used entries beyond max_entries."""
+        entries = []
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".json"):
+                path = os.path.join(self.directory, filename)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
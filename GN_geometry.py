@@ -0,0 +1,172 @@
+"""
+Pure-Python geometry and spec helpers shared by the SMT and grid backends (no z3 import).
+"""
+from array import array
+from collections import Counter
+from collections.abc import Mapping
+from itertools import combinations
+
+
+class Layout(Mapping):
+    """
+    Rectangles of a set of rooms, stored as one flat integer array (x, y, w, h per room)
+    plus a name -> index map. Reads like a {name: (x, y, w, h)} dict, writes go straight
+    into the array, and the whole layout is cheap to copy, compare, hash (via key()),
+    serialise (via to_json()) and stack into a NumPy (rooms, 4) array (via rows()).
+    """
+
+    __slots__ = ("names", "index", "data")
+
+    def __init__(self, names, rects=None):
+        self.names = tuple(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        if rects is None:
+            self.data = array("q", bytes(8 * 4 * len(self.names)))
+        else:
+            self.data = array("q", (int(v) for rect in rects for v in rect))
+            if len(self.data) != 4 * len(self.names):
+                raise ValueError("A layout needs exactly one (x, y, w, h) per room")
+
+    @classmethod
+    def from_rects(cls, rects):
+        """Layout from a {name: (x, y, w, h)} mapping, in its order."""
+        return cls(rects.keys(), rects.values())
+
+    @classmethod
+    def from_positions(cls, positions, rooms):
+        """Layout from {name: (x, y)} with every room at its min size in `rooms`."""
+        return cls(positions.keys(), ((x, y, *rooms[name][:2]) for name, (x, y) in positions.items()))
+
+    @classmethod
+    def from_json(cls, entry):
+        return cls(entry["names"], entry["rects"])
+
+    def __getitem__(self, name):
+        i = 4 * self.index[name]
+        return tuple(self.data[i:i + 4])
+
+    def __setitem__(self, name, rect):
+        i = 4 * self.index[name]
+        self.data[i:i + 4] = array("q", rect)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return f"Layout({dict(self.items())})"
+
+    def __reduce__(self):
+        return Layout, (self.names, self.rows())
+
+    def position(self, name):
+        i = 4 * self.index[name]
+        return self.data[i], self.data[i + 1]
+
+    def positions(self):
+        """{name: (x, y)} of every room."""
+        return {name: self.position(name) for name in self.names}
+
+    def rows(self):
+        """[(x, y, w, h), ...] in room order."""
+        data = self.data
+        return [tuple(data[i:i + 4]) for i in range(0, len(data), 4)]
+
+    def copy(self):
+        layout = Layout.__new__(Layout)
+        layout.names, layout.index, layout.data = self.names, self.index, array("q", self.data)
+        return layout
+
+    def key(self):
+        """Hashable snapshot of the layout (room names and packed rectangles)."""
+        return self.names, self.data.tobytes()
+
+    def to_json(self):
+        return {"names": list(self.names), "rects": [list(rect) for rect in self.rows()]}
+
+
+def touches(rect1, rect2):
+    """Whether two (x, y, w, h) rectangles share a wall segment of positive length."""
+    x1, y1, w1, h1 = rect1
+    x2, y2, w2, h2 = rect2
+    if (x1 + w1 == x2 or x2 + w2 == x1) and max(y1, y2) < min(y1 + h1, y2 + h2):
+        return True
+    return (y1 + h1 == y2 or y2 + h2 == y1) and max(x1, x2) < min(x1 + w1, x2 + w2)
+
+
+def overlaps(rect1, rect2):
+    """Whether two (x, y, w, h) rectangles share any area."""
+    x1, y1, w1, h1 = rect1
+    x2, y2, w2, h2 = rect2
+    return x1 < x2 + w2 and x2 < x1 + w1 and y1 < y2 + h2 and y2 < y1 + h1
+
+
+def layout_fits(layout, rooms, edges, outer_width, outer_height, holes):
+    """
+    Whether `layout` places exactly the rooms of the spec at their min sizes, inside the
+    boundary, clear of the holes and of each other, with every edge sharing a wall.
+    """
+    if set(layout) != set(rooms):
+        return False
+    for name, (x, y, w, h) in layout.items():
+        if (w, h) != tuple(rooms[name][:2]) or x < 0 or y < 0 or x + w > outer_width or y + h > outer_height:
+            return False
+        if any(overlaps((x, y, w, h), hole) for hole in holes):
+            return False
+    if any(overlaps(rect1, rect2) for rect1, rect2 in combinations(layout.values(), 2)):
+        return False
+    return all(touches(layout[name1], layout[name2]) for name1, name2 in edges)
+
+
+def adjacency_index(rooms, edges):
+    """{name: [neighbour, ...]} for every room, with one entry per edge (so repeats count)."""
+    neighbours = {name: [] for name in rooms}
+    for name1, name2 in edges:
+        neighbours[name1].append(name2)
+        neighbours[name2].append(name1)
+    return neighbours
+
+
+def interchangeable_rooms(rooms, edges, edge_weights=None):
+    """
+    Group rooms that can trade places without changing the problem: same
+    (min_w, min_h, max_w, max_h) and swapping their names maps the edge list onto itself,
+    each edge onto one of equal priority in `edge_weights` ({(name1, name2): weight},
+    either orientation, unlisted edges weighing 1).
+    Returns a list of groups (lists of names in `rooms` order) with at least two rooms.
+    """
+    edge_weights = edge_weights or {}
+
+    def weight(name1, name2):
+        return edge_weights.get((name1, name2), edge_weights.get((name2, name1), 1))
+
+    edge_counts = Counter((tuple(sorted(edge)), weight(*edge)) for edge in edges)
+
+    def swappable(a, b):
+        swap = {a: b, b: a}
+        swapped = Counter(
+            (tuple(sorted((swap.get(name1, name1), swap.get(name2, name2)))), weight(name1, name2))
+            for name1, name2 in edges
+        )
+        return swapped == edge_counts
+
+    # Union-find over swappable pairs: transpositions a<->b and b<->c generate every
+    # permutation of {a, b, c}, so the whole group can be ordered
+    parent = {name: name for name in rooms}
+
+    def find(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    for name1, name2 in combinations(rooms, 2):
+        if tuple(rooms[name1]) == tuple(rooms[name2]) and find(name1) != find(name2) and swappable(name1, name2):
+            parent[find(name2)] = find(name1)
+
+    groups = {}
+    for name in rooms:
+        groups.setdefault(find(name), []).append(name)
+    return [group for group in groups.values() if len(group) > 1]
@@ -0,0 +1,298 @@
+"""
+Native placement engine: backtracking over an occupancy grid, without z3.
+
+The grid is one integer bitmask per row (bit x set = cell (x, y) taken), with holes
+stamped in up front, so testing or stamping a w x h room is h AND/OR operations.
+Rooms are placed at their min size under the same rules as the SMT model: inside
+the boundary, out of holes, no overlaps, and every active edge shares a wall of
+positive length.
+"""
+import time
+from itertools import combinations
+
+from GN_geometry import Layout, adjacency_index, interchangeable_rooms, touches
+
+
+class GridSearch:
+    """Depth-first placement of every room with forward checking on its neighbours."""
+
+    def __init__(self, rooms, edges, outer_width, outer_height, holes, budget=None):
+        self.sizes = {name: (dims[0], dims[1]) for name, dims in rooms.items()}
+        self.outer_width = outer_width
+        self.outer_height = outer_height
+        self.budget = budget
+        self.nodes = 0
+
+        self.rows = [0] * outer_height
+        for hole_x, hole_y, hole_width, hole_height in holes:
+            x1, x2 = max(0, hole_x), min(outer_width, hole_x + hole_width)
+            for y in range(max(0, hole_y), min(outer_height, hole_y + hole_height)):
+                if x2 > x1:
+                    self.rows[y] |= ((1 << (x2 - x1)) - 1) << x1
+        self.free_cells = sum(outer_width - row.bit_count() for row in self.rows)
+
+        self.neighbours = adjacency_index(rooms, edges)
+        self.placed = {}  # name -> (x, y, w, h)
+
+        # Rooms that can trade places keep their (x, y) order within a group, as in
+        # add_symmetry_breaking, so each arrangement is searched once, not once per permutation
+        self.siblings = {name: ((), ()) for name in rooms}
+        for group in interchangeable_rooms(rooms, edges):
+            for i, name in enumerate(group):
+                self.siblings[name] = (group[:i], group[i + 1:])
+
+    def is_free(self, x, y, w, h):
+        if x < 0 or y < 0 or x + w > self.outer_width or y + h > self.outer_height:
+            return False
+        mask = ((1 << w) - 1) << x
+        rows = self.rows
+        for row in range(y, y + h):
+            if rows[row] & mask:
+                return False
+        return True
+
+    def stamp(self, x, y, w, h):
+        mask = ((1 << w) - 1) << x
+        for row in range(y, y + h):
+            self.rows[row] ^= mask
+
+    def contact(self, x, y, w, h):
+        """Perimeter cells of a candidate that touch the boundary, a hole or a placed room."""
+        rows = self.rows
+        side_bits = (1 << (x - 1) if x > 0 else 0) | (1 << (x + w) if x + w < self.outer_width else 0)
+        side_walls = (x == 0) + (x + w == self.outer_width)
+        score = side_walls * h
+        for row in range(y, y + h):
+            score += (rows[row] & side_bits).bit_count()
+        mask = ((1 << w) - 1) << x
+        for row in (y - 1, y + h):
+            if 0 <= row < self.outer_height:
+                score += (rows[row] & mask).bit_count()
+            else:
+                score += w
+        return score
+
+    def blocked_bottom_left(self, x, y, w, h):
+        """Whether a room at (x, y) can slide neither left nor down."""
+        rows = self.rows
+        if x > 0 and not any(rows[row] >> (x - 1) & 1 for row in range(y, y + h)):
+            return False
+        return y == 0 or bool(rows[y - 1] & (((1 << w) - 1) << x))
+
+    def free_in_column(self, x, w, h, y_start, y_stop):
+        """Every y in [y_start, y_stop) where a w x h room at column x is free (one pass over the rows)."""
+        if x < 0 or x + w > self.outer_width:
+            return []
+        y_start, y_stop = max(0, y_start), min(y_stop, self.outer_height - h + 1)
+        mask = ((1 << w) - 1) << x
+        rows = self.rows
+        result = []
+        run = 0
+        for row in range(y_start, y_stop + h - 1):
+            run = 0 if rows[row] & mask else run + 1
+            if run >= h:
+                result.append(row - h + 1)
+        return result
+
+    def free_in_row(self, y, w, h, x_start, x_stop):
+        """Every x in [x_start, x_stop) where a w x h room at row y is free."""
+        if y < 0 or y + h > self.outer_height:
+            return []
+        occupied = 0
+        for row in range(y, y + h):
+            occupied |= self.rows[row]
+        window = (1 << w) - 1
+        return [
+            x for x in range(max(0, x_start), min(x_stop, self.outer_width - w + 1))
+            if not (occupied >> x) & window
+        ]
+
+    def spots_around(self, name, rect):
+        """Free positions for `name` sharing a wall of positive length with `rect`."""
+        w, h = self.sizes[name]
+        px, py, pw, ph = rect
+        positions = []
+        for x in (px - w, px + pw):
+            positions.extend((x, y) for y in self.free_in_column(x, w, h, py - h + 1, py + ph))
+        for y in (py - h, py + ph):
+            positions.extend((x, y) for x in self.free_in_row(y, w, h, px - w + 1, px + pw))
+        return positions
+
+    def candidates(self, name):
+        """Free positions for `name` that touch every placed neighbour."""
+        w, h = self.sizes[name]
+        placed_neighbours = [self.placed[n] for n in self.neighbours[name] if n in self.placed]
+        if placed_neighbours:
+            # Only positions along the wall of one placed neighbour can touch it
+            anchor = min(placed_neighbours, key=lambda rect: rect[2] + rect[3])
+            return self.in_sibling_order(name, [
+                (x, y) for x, y in self.spots_around(name, anchor)
+                if all(touches((x, y, w, h), other) for other in placed_neighbours)
+            ])
+
+        positions = [
+            (x, y)
+            for y in range(self.outer_height - h + 1)
+            for x in self.free_in_row(y, w, h, 0, self.outer_width)
+        ]
+        if not self.neighbours[name] and len(self.placed) == len(self.sizes) - 1:
+            # The last room, if it has no edges: everything else is fixed, so any spot for
+            # it can be slid down/left until blocked, and only those spots are tried. With
+            # more rooms to come this is unsound, as a later room may be what blocks it
+            positions = [(x, y) for x, y in positions if self.blocked_bottom_left(x, y, w, h)]
+        return self.in_sibling_order(name, positions)
+
+    def in_sibling_order(self, name, positions):
+        """Keep positions after every placed earlier sibling and before every placed later one."""
+        before, after = self.siblings[name]
+        lower = max((self.placed[n][:2] for n in before if n in self.placed), default=None)
+        upper = min((self.placed[n][:2] for n in after if n in self.placed), default=None)
+        if lower is None and upper is None:
+            return positions
+        return [
+            pos for pos in positions
+            if (lower is None or pos > lower) and (upper is None or pos < upper)
+        ]
+
+    def has_touching_spot(self, name, rect):
+        """Whether `name` still fits somewhere along the walls of `rect`."""
+        return bool(self.spots_around(name, rect))
+
+    def lookahead(self, name, positions):
+        """Drop spots that leave an unplaced neighbour of `name` no room to touch it."""
+        w, h = self.sizes[name]
+        waiting = [n for n in self.neighbours[name] if n not in self.placed]
+        if not waiting:
+            return positions
+        result = []
+        for x, y in positions:
+            self.stamp(x, y, w, h)
+            if all(self.has_touching_spot(n, (x, y, w, h)) for n in waiting):
+                result.append((x, y))
+            self.stamp(x, y, w, h)
+        return result
+
+    def ordered(self, name, positions):
+        """Adjacency-aware value ordering: spots hugging walls and placed rooms first."""
+        w, h = self.sizes[name]
+        return sorted(positions, key=lambda pos: (-self.contact(pos[0], pos[1], w, h), pos[1], pos[0]))
+
+    def search(self):
+        self.nodes += 1
+        if self.budget is not None and self.nodes % 256 == 0 and self.budget.expired():
+            raise TimeoutError("time budget exhausted")
+
+        unplaced = [name for name in self.sizes if name not in self.placed]
+        if not unplaced:
+            return True
+        if sum(w * h for w, h in (self.sizes[name] for name in unplaced)) > self.free_cells:
+            return False
+
+        # Forward check: every room with a placed neighbour must still have a spot.
+        # Branch on the one with the fewest, but leave rooms whose neighbours are all
+        # placed (leaves) for last: they only compete for space, and trying their spots
+        # early multiplies the search whenever the real conflict is elsewhere
+        best_name, best_candidates, best_key = None, None, None
+        for name in unplaced:
+            if any(n in self.placed for n in self.neighbours[name]):
+                options = self.candidates(name)
+                if not options:
+                    return False
+                is_leaf = all(n in self.placed for n in self.neighbours[name])
+                key = (is_leaf, len(options))
+                if best_key is None or key < best_key:
+                    best_name, best_candidates, best_key = name, options, key
+        if best_name is None:
+            # Nothing is anchored yet: start from the most connected, then largest, room
+            best_name = max(
+                unplaced,
+                key=lambda name: (len(self.neighbours[name]), self.sizes[name][0] * self.sizes[name][1]),
+            )
+            best_candidates = self.candidates(best_name)
+
+        w, h = self.sizes[best_name]
+        for x, y in self.ordered(best_name, self.lookahead(best_name, best_candidates)):
+            self.stamp(x, y, w, h)
+            self.free_cells -= w * h
+            self.placed[best_name] = (x, y, w, h)
+            if self.search():
+                return True
+            del self.placed[best_name]
+            self.free_cells += w * h
+            self.stamp(x, y, w, h)
+        return False
+
+
+def place_rooms(rooms, edges, outer_width, outer_height, holes, budget=None):
+    """One backtracking search with every edge in `edges` hard. Returns a Layout or None."""
+    search = GridSearch(rooms, edges, outer_width, outer_height, holes, budget)
+    found = search.search()
+    if budget is not None:
+        budget.notify(candidates=1)
+    if not found:
+        return None
+    return Layout(rooms, (search.placed[name] for name in rooms))
+
+
+def bottom_left_packing(rooms, outer_width, outer_height, holes):
+    """
+    Greedy min-size placement for previews: largest room first, each at the lowest, then
+    leftmost, free spot. No adjacencies and no backtracking, so it is instant but may
+    leave out rooms that place_rooms would fit.
+    Returns (Layout of the placed rooms, names of the rooms that did not fit).
+    """
+    search = GridSearch(rooms, [], outer_width, outer_height, holes)
+    placed, unplaced = {}, []
+    for name in sorted(rooms, key=lambda name: -search.sizes[name][0] * search.sizes[name][1]):
+        w, h = search.sizes[name]
+        spot = next(
+            ((x, y) for y in range(outer_height - h + 1) for x in search.free_in_row(y, w, h, 0, outer_width)),
+            None,
+        )
+        if spot is None:
+            unplaced.append(name)
+            continue
+        search.stamp(spot[0], spot[1], w, h)
+        placed[name] = (spot[0], spot[1], w, h)
+    return Layout.from_rects({name: placed[name] for name in rooms if name in placed}), unplaced
+
+
+def find_grid_solution(rooms, edges, outer_width, outer_height, holes, max_removals=None, budget=None):
+    """
+    Grid backend for find_valid_solution: same arguments and (initial_layout, used_edges)
+    result, dropping the first subset of edges in combinations() order that makes the
+    spec feasible. Raises TimeoutError if `budget` runs out.
+    """
+    solution_start = time.time()
+    initial_layout = place_rooms(rooms, edges, outer_width, outer_height, holes, budget)
+    if initial_layout is not None:
+        print("Solution found with all adjacencies in", time.time() - solution_start, "seconds")
+        return initial_layout, edges
+
+    print("No solution with all adjacencies, trying to remove some...")
+    # If the rooms cannot even be packed, no subset of edges will help. Otherwise the
+    # packing doubles as the anytime fallback, keeping whichever adjacencies hold by chance
+    fallback = place_rooms(rooms, [], outer_width, outer_height, holes, budget)
+    if fallback is None:
+        print("No valid layout found even after removing all adjacency constraints")
+        return None, None
+    if budget is not None:
+        budget.record(fallback, [edge for edge in edges if touches(fallback[edge[0]], fallback[edge[1]])])
+
+    if max_removals is None:
+        max_removals = len(edges)
+    for num_to_remove in range(1, max_removals + 1):
+        print(f"Trying to remove {num_to_remove} adjacency constraints...")
+        if budget is not None:
+            budget.notify(removals=num_to_remove)
+        for removal in combinations(range(len(edges)), num_to_remove):
+            remaining_edges = [edge for i, edge in enumerate(edges) if i not in removal]
+            initial_layout = place_rooms(rooms, remaining_edges, outer_width, outer_height, holes, budget)
+            if initial_layout is not None:
+                print(f"Solution found by removing {num_to_remove} adjacencies in",
+                      time.time() - solution_start, "seconds")
+                print("Removed adjacencies:", tuple(edges[i] for i in removal))
+                return initial_layout, remaining_edges
+
+    print("No valid layout found even after removing all adjacency constraints")
+    return None, None
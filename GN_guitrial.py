@@ -1,14 +1,20 @@
 import tkinter as tk
 import json
 import os
+import queue
+import threading
 import time
+from collections import Counter
 from tkinter import messagebox
 
 # Import your algorithm
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__))) #converts this file's path into absolute to extract just directory where it can look for GN_assignment next
-from GN_assignment import find_valid_solution, compute_stretch
+from GN_assignment import LayoutSession, SolveBudget, solve_layout
+from GN_cache import LayoutCache
+from GN_geometry import Layout
+from GN_grid import bottom_left_packing
 
 # Dark mode color scheme
 BG_COLOR = "#2d2d2d"
@@ -36,8 +42,32 @@ ROOM_COLORS = {
 
 user_inputs = {}
 SAVE_FILE = "last_input.json"
-room_placements = {}
+SOLVE_TIME_BUDGET = 30  # seconds before the best layout found so far is shown instead
+SOLVE_POLL_MS = 100  # how often the Tk thread checks on the solver thread
+room_placements = Layout([])  # Rectangles of the layout on screen
 actual_edges_satisfied = []  # Store which edges were actually satisfied
+layout_session = LayoutSession()  # Keeps the solver alive between submits so small edits re-solve fast
+layout_cache = LayoutCache()  # Solved specs on disk, so resubmitting a plan skips the solver
+solve_queue = queue.Queue()  # ("progress" | "done" | "error", payload) messages from the solver thread
+active_budget = None  # SolveBudget of the solve in progress, used to cancel it
+previous_layout = None  # initial_layout of the last solve, the warm start of the next one
+
+# Retained canvas scene: each room part, hole, edge line and the outline is one canvas
+# item, kept between redraws and only updated where its geometry or style changed
+scene_items = {}  # key, e.g. ("room", "A") or ("edge", "A", "B", 1) -> canvas item id
+scene_specs = {}  # key -> (kind, geometry in grid units, options) as last drawn
+scene_view = None  # (scale, offset_x, offset_y, grid_width, grid_height) the items are drawn with
+
+# Live preview while typing (before the first solve)
+PREVIEW_DELAY_MS = 150  # typing pause before the preview redraws
+preview_after_id = None  # the one pending draw_preview callback, replaced on every keystroke
+hole_geometry = {}  # hole index -> (x, y, w, h) parsed from its entries, or None while incomplete
+dirty_holes = set()  # hole indices edited since their geometry was last parsed
+preview_footprints = None  # (inputs, Layout, rooms that did not fit) of the last min-size packing
+
+# Automatic re-solve after edits (when "Auto re-solve" is ticked)
+AUTO_SOLVE_DELAY_MS = 800  # editing pause before the layout is re-solved
+auto_solve_after_id = None  # the one pending auto_solve callback, replaced on every edit
 
 def show_instructions():
     instructions = """
@@ -48,7 +78,9 @@ GENERAL USAGE:
 2. Specify number of holes and their dimensions  
 3. Set room sizes and labels for each room (A-J)
 4. Add adjacency requirements (e.g., "A B" means rooms A and B must be adjacent)
-5. Click Submit to generate the layout
+   Optionally add a priority ("A B 5"); higher priorities are kept first when
+   not every adjacency can be satisfied
+5. Click Submit to generate the layout; Cancel stops a solve that takes too long
 
 FEATURES:
 - Room Labels: Each room can have a custom name/label
@@ -56,6 +88,10 @@ FEATURES:
 - Adjacency Lines: Green lines show satisfied adjacencies
 - Swapping Lines: Red dashed lines show room conflicts
 - Dynamic Holes: Red areas show holes as you input them
+- Room Footprints: Dashed rooms show the min sizes packed around the holes
+  before the first solve, and which rooms cannot fit at all
+- Auto Re-solve: When ticked, the layout is re-solved shortly after you stop
+  editing, starting from the previous layout so unaffected rooms stay put
 - Real Algorithm: Uses Z3 solver for optimal room placement
 
 KEYBOARD SHORTCUTS:
@@ -85,6 +121,7 @@ def load_inputs():
         for i, hole in enumerate(data.get("holes", [])): #enumerate() allows you to loop through data["holes"] and get the index (i) for each hole, each hole is a list/ tuple of 4 values [x,y,w,h] looped over by j: thus upadating all 4 fields of each hole
             for j in range(4):
                 hole_entries[i][j].insert(0, str(hole[j]))
+            dirty_holes.add(i)
 
         room_labels_saved = data.get("room_labels", {})
 
@@ -112,10 +149,17 @@ def load_inputs():
                 room_entries[name][4].insert(0, label)
 room_names = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "J"]
 
-def submit_data(event=None):
+def submit_data(event=None, quiet=False):
+    def input_error(message):
+        # Automatic re-solves skip half-typed inputs without interrupting the user
+        if quiet:
+            print(f"Input Error: {message}")
+        else:
+            messagebox.showerror("Input Error", message)
+
     try:
         if not entry_width.get() or not entry_height.get():   #Checks if the outer grid's width/height fields are empty. Shows an error if missing
-            messagebox.showerror("Input Error", "Outer grid dimensions must be specified")
+            input_error("Outer grid dimensions must be specified")
             return
 
         outer_width = int(entry_width.get()) #Converts input values to integers. Handles empty hole count as 0
@@ -134,7 +178,7 @@ def submit_data(event=None):
                 h = int(hole_entries[i][3].get())
                 holes.append((x, y, w, h)) # Adds this hole to the holes list
             except ValueError:
-                messagebox.showerror("Input Error", f"Invalid hole #{i+1} dimensions") #If conversion to integers fails (non-numeric input), shows error with hole number
+                input_error(f"Invalid hole #{i+1} dimensions") #If conversion to integers fails (non-numeric input), shows error with hole number
                 return
 
         rooms = {}
@@ -156,20 +200,28 @@ def submit_data(event=None):
                 label = room_entries[name][4].get() or name
                 rooms[name] = (min_width, min_height, max_width, max_height)
             except ValueError:
-                messagebox.showerror("Input Error", f"Invalid dimensions for room {name}")
+                input_error(f"Invalid dimensions for room {name}")
                 return
 
 
         edges_raw = text_edges.get("1.0", "end").strip()
         edges_list = []
+        edge_weights = []  # [name1, name2, weight] for lines written as "A B weight"
         for line in edges_raw.splitlines():
             line = line.strip()
             if line:
                 parts = line.split()
-                if len(parts) == 2 and parts[0] in room_names and parts[1] in room_names:
+                if len(parts) in (2, 3) and parts[0] in room_names and parts[1] in room_names:
                     edges_list.append((parts[0], parts[1]))
+                    if len(parts) == 3:
+                        try:
+                            edge_weights.append([parts[0], parts[1], int(parts[2])])
+                        except ValueError:
+                            input_error(f"Invalid adjacency priority in line '{line}'")
+                            return
         
         user_inputs["edges"] = edges_list
+        user_inputs["edge_weights"] = edge_weights
         user_inputs["edges_text"] = edges_raw  # Save raw text here
 
         # Store for algorithm
@@ -190,287 +242,455 @@ def submit_data(event=None):
         save_inputs()
         
         # Generate and display the layout using real algorithm
-        generate_layout()
+        generate_layout(quiet)
         
     except Exception as e:
-        messagebox.showerror("Input Error", str(e))
-
-def generate_layout():
-    """Generate the actual room layout using the GN_assignment algorithm"""
-    global room_placements, actual_edges_satisfied
-    
+        input_error(str(e))
+
+def generate_layout(quiet=False):
+    """Start the GN_assignment algorithm on a worker thread; poll_solve shows the result"""
+    global active_budget
+    if active_budget is not None:
+        return  # a solve is already running
+
+    # Set up the global variables that GN_assignment expects
+    import GN_assignment
+    GN_assignment.rooms = user_inputs["rooms"]
+    GN_assignment.edges = user_inputs["edges"]
+    GN_assignment.outer_width = user_inputs["outer_width"]
+    GN_assignment.outer_height = user_inputs["outer_height"]
+    GN_assignment.holes = user_inputs["holes"]
+
+    print("Running room layout algorithm...")
+
+    # Edge priorities switch the algorithm to weighted (MaxSMT) solving, otherwise
+    # the persistent session only re-encodes what changed since the last submit
+    edge_weights = {(name1, name2): weight for name1, name2, weight in user_inputs.get("edge_weights", [])}
+    active_budget = SolveBudget.from_seconds(
+        SOLVE_TIME_BUDGET, on_progress=lambda progress: solve_queue.put(("progress", progress))
+    )
+    spec = (
+        user_inputs["rooms"],
+        user_inputs["edges"],
+        user_inputs["outer_width"],
+        user_inputs["outer_height"],
+        user_inputs["holes"],
+    )
+    options = {
+        "budget": active_budget,
+        "session": None if edge_weights else layout_session,
+        "cache": layout_cache,
+        "relaxation": "maxsmt" if edge_weights else "core",
+        "edge_weights": edge_weights,
+        "warm_start": previous_layout,  # unchanged rooms stay where they are when possible
+    }
+    threading.Thread(target=solve_worker, args=(spec, options), daemon=True).start()
+
+    submit_btn.config(state="disabled")
+    cancel_btn.config(state="normal")
+    progress_label.config(text="Solving...")
+    root.after(SOLVE_POLL_MS, poll_solve, quiet)
+
+def solve_worker(spec, options):
+    """Worker thread: run the solver and hand the result (or the error) back to the Tk thread"""
     try:
-        # Set up the global variables that GN_assignment expects
-        import GN_assignment
-        GN_assignment.rooms = user_inputs["rooms"]
-        GN_assignment.edges = user_inputs["edges"]
-        GN_assignment.outer_width = user_inputs["outer_width"]
-        GN_assignment.outer_height = user_inputs["outer_height"]
-        GN_assignment.holes = user_inputs["holes"]
-        
-        print("Running room layout algorithm...")
-        
-        # Call the actual algorithm
-        initial_layout, used_edges = find_valid_solution(
-            user_inputs["rooms"], 
-            user_inputs["edges"], 
-            user_inputs["outer_width"], 
-            user_inputs["outer_height"], 
-            user_inputs["holes"])
-        
-        if initial_layout is None:
-            messagebox.showerror("Algorithm Error", "No valid layout found by the algorithm")
-            return
-            
-        print("Initial layout found, computing stretch...")
-        
-        # Compute the stretched layout
-        stretched_rectangles = compute_stretch(
-            initial_layout, 
-            user_inputs["rooms"], 
-            used_edges, 
-            user_inputs["outer_width"], 
-            user_inputs["outer_height"], 
-            user_inputs["holes"])
-        
-        print("Stretch computation complete")
-        
-        # Convert to format expected by GUI
-        room_placements = {}
-        for name, (x, y, w, h) in stretched_rectangles.items():
-            room_placements[name] = {
-                "pos": (x, y),
-                "size": (w, h),
-                "label": user_inputs["room_labels"].get(name, name)
-            }
-        
-        # Store which edges were actually satisfied
-        actual_edges_satisfied = used_edges
-        
-        print(f"Layout generated with {len(room_placements)} rooms")
-        print(f"Satisfied {len(actual_edges_satisfied)} out of {len(user_inputs['edges'])} adjacency constraints")
-        
-        draw_layout()
-        
+        solve_queue.put(("done", solve_layout(*spec, **options)))
     except Exception as e:
-        print(f"Error in generate_layout: {e}")
-        messagebox.showerror("Algorithm Error", f"Error running layout algorithm: {str(e)}")
+        solve_queue.put(("error", e))
+
+def cancel_solve():
+    """Interrupt the running solve; poll_solve picks up the cancelled result"""
+    if active_budget is not None:
+        active_budget.cancel()
+        cancel_btn.config(state="disabled")
+        progress_label.config(text="Cancelling...")
+
+def show_progress(progress):
+    if progress["removals"]:
+        step = f"Removing {progress['removals']} adjacencies"
+    else:
+        step = "Trying every adjacency"
+    progress_label.config(
+        text=f"{step} | {progress['candidates']} candidates tried | {progress['elapsed']:.1f}s"
+    )
+
+def report_problem(title, message, quiet, show=messagebox.showerror):
+    """Message box for a solve the user asked for; automatic re-solves only note it under the buttons"""
+    if quiet:
+        progress_label.config(text=message)
+    else:
+        show(title, message)
+
+def poll_solve(quiet=False):
+    """Runs on the Tk thread every SOLVE_POLL_MS while solving: drains the worker's queue"""
+    global active_budget
+    finished = None
+    while True:
+        try:
+            kind, payload = solve_queue.get_nowait()
+        except queue.Empty:
+            break
+        if kind == "progress":
+            if not active_budget.cancelled:
+                show_progress(payload)
+        else:
+            finished = (kind, payload)
+
+    if finished is None:
+        if active_budget.cancelled:
+            active_budget.cancel()  # again, in case the first one landed between two checks
+        root.after(SOLVE_POLL_MS, poll_solve, quiet)
+        return
+
+    active_budget = None
+    submit_btn.config(state="normal")
+    cancel_btn.config(state="disabled")
+    kind, payload = finished
+    if kind == "error":
+        progress_label.config(text="")
+        print(f"Error in generate_layout: {payload}")
+        report_problem("Algorithm Error", f"Error running layout algorithm: {str(payload)}", quiet)
+        return
+    show_result(payload, quiet)
+
+def show_result(result, quiet=False):
+    """Display a finished solve_layout result"""
+    global room_placements, actual_edges_satisfied, previous_layout
+
+    if result["status"] == "cancelled":
+        print("Solve cancelled")
+        progress_label.config(text="Cancelled")
+        return
+    progress_label.config(text=f"{result['status'].capitalize()} in {sum(result['timings'].values()):.1f}s")
+    if result["status"] == "infeasible":
+        report_problem("Algorithm Error", "No valid layout found by the algorithm", quiet)
+        return
+    if result["rectangles"] is None:
+        report_problem("Algorithm Error", f"No layout found within the {SOLVE_TIME_BUDGET} second time limit", quiet)
+        return
+
+    used_edges = result["used_edges"]
+    print(f"Layout status: {result['status']} (solve {result['timings']['solve']:.2f}s, "
+          f"stretch {result['timings']['stretch']:.2f}s)")
+
+    room_placements = result["rectangles"]
+    previous_layout = result["initial_layout"]
+
+    # Store which edges were actually satisfied
+    actual_edges_satisfied = used_edges
+
+    print(f"Layout generated with {len(room_placements)} rooms")
+    print(f"Satisfied {len(actual_edges_satisfied)} out of {len(user_inputs['edges'])} adjacency constraints")
+
+    draw_layout()
+
+    if result["status"] == "timeout":
+        report_problem("Time Limit", f"Stopped after {SOLVE_TIME_BUDGET} seconds; showing the best layout found so far",
+                       quiet, messagebox.showwarning)
+
+def compute_view(grid_width, grid_height):
+    """Screen transform (scale, offset_x, offset_y, grid_width, grid_height) fitting the grid in the canvas"""
+    canvas_width = layout_canvas.winfo_width()
+    canvas_height = layout_canvas.winfo_height()
+    if canvas_width <= 1 or canvas_height <= 1:
+        return None
+    scale = min(canvas_width / grid_width, canvas_height / grid_height) * 0.85
+    offset_x = (canvas_width - grid_width * scale) / 2
+    offset_y = (canvas_height - grid_height * scale) / 2
+    return (scale, offset_x, offset_y, grid_width, grid_height)
+
+def to_screen(kind, geometry, view):
+    """Canvas coordinates of a scene item from its geometry in grid units (y pointing up)"""
+    scale, offset_x, offset_y, _, grid_height = view
+    if kind == "rectangle":  # (x, y, w, h)
+        x, y, w, h = geometry
+        x1 = offset_x + x * scale
+        y1 = offset_y + (grid_height - y - h) * scale
+        return (x1, y1, x1 + w * scale, y1 + h * scale)
+    if kind == "line":  # (x1, y1, x2, y2)
+        x1, y1, x2, y2 = geometry
+        return (offset_x + x1 * scale, offset_y + (grid_height - y1) * scale,
+                offset_x + x2 * scale, offset_y + (grid_height - y2) * scale)
+    # text: (x, y, dy), dy being a fixed offset in pixels
+    x, y, dy = geometry
+    return (offset_x + x * scale, offset_y + (grid_height - y) * scale + dy)
+
+def set_view(view):
+    """
+    Move every scene item to a new screen transform without recreating anything: shapes
+    are rescaled and shifted as a whole (the transform is linear in each axis), text
+    items are re-placed so their pixel offsets and font sizes stay as they are
+    """
+    global scene_view
+    old = scene_view
+    scene_view = view
+    if old is None or old == view or not scene_items:
+        return
+    old_scale, old_x, old_y, _, old_height = old
+    scale, offset_x, offset_y, _, height = view
+    ratio = scale / old_scale
+    layout_canvas.scale("shape", 0, 0, ratio, ratio)
+    layout_canvas.move("shape", offset_x - ratio * old_x,
+                       offset_y + height * scale - ratio * (old_y + old_height * old_scale))
+    for key, (kind, geometry, _) in scene_specs.items():
+        if kind == "text":
+            layout_canvas.coords(scene_items[key], *to_screen(kind, geometry, view))
+
+def put_item(key, kind, layer, geometry, **options):
+    """
+    Make the scene item `key` show `geometry` (grid units) with `options`: created the
+    first time, afterwards only touched if its geometry or options changed.
+    Returns True if a canvas item was created.
+    """
+    item = scene_items.get(key)
+    if item is None:
+        tags = ("scene", layer) if kind == "text" else ("scene", layer, "shape")
+        create = getattr(layout_canvas, f"create_{kind}")
+        scene_items[key] = create(*to_screen(kind, geometry, scene_view), tags=tags, **options)
+        scene_specs[key] = (kind, geometry, options)
+        return True
+    _, old_geometry, old_options = scene_specs[key]
+    if geometry != old_geometry:
+        layout_canvas.coords(item, *to_screen(kind, geometry, scene_view))
+    changed = {name: value for name, value in options.items() if old_options.get(name) != value}
+    if changed:
+        layout_canvas.itemconfigure(item, **changed)
+    scene_specs[key] = (kind, geometry, options)
+    return False
+
+def prune_scene(keep):
+    """Delete the scene items whose keys are not in `keep`"""
+    for key in [key for key in scene_items if key not in keep]:
+        layout_canvas.delete(scene_items.pop(key))
+        del scene_specs[key]
+
+def restack_scene():
+    """Restore the layer order after new items were created on top of everything"""
+    for layer in ("hole", "room", "label", "edge"):
+        layout_canvas.tag_raise(layer)
+
+def put_outline(keep):
+    width, height = scene_view[3], scene_view[4]
+    keep.add(("outline",))
+    return put_item(("outline",), "rectangle", "outline", (0, 0, width, height), outline=FG_COLOR, width=2)
 
 def draw_layout():
-    """Draw the complete layout with rooms, labels, and adjacency lines"""
-    layout_canvas.delete("all")
-    
+    """Draw the complete layout with rooms, labels, and adjacency lines, updating only what changed"""
     try:
         width = user_inputs["outer_width"]
         height = user_inputs["outer_height"]
-        
-        canvas_width = layout_canvas.winfo_width()
-        canvas_height = layout_canvas.winfo_height()
-        
-        if canvas_width <= 1 or canvas_height <= 1:
+
+        view = compute_view(width, height)
+        if view is None:
             layout_canvas.after(100, draw_layout)
             return
-            
-        scale = min(canvas_width / width, canvas_height / height) * 0.85
-        offset_x = (canvas_width - width * scale) / 2
-        offset_y = (canvas_height - height * scale) / 2
-        
-        # Draw grid outline
-        layout_canvas.create_rectangle(
-            offset_x, offset_y,
-            offset_x + width * scale, offset_y + height * scale,
-            outline=FG_COLOR, width=2
-        )
-        
-        # Draw holes first (so they appear behind rooms)
-        draw_holes(offset_x, offset_y, scale, height)
-        
-        # Draw rooms on top
-        for room_id, room_data in room_placements.items():
-            x, y = room_data["pos"]
-            w, h = room_data["size"]
-            label = room_data["label"]
-            
+        set_view(view)
+
+        keep = set()
+        created = put_outline(keep)
+
+        # Holes (kept behind rooms by restack_scene)
+        created |= draw_holes(keep)
+
+        # Rooms
+        for room_id, (x, y, w, h) in room_placements.items():
+            label = user_inputs["room_labels"].get(room_id, room_id)
+
             # Get user requested dimensions
             user_dims = user_inputs["rooms"][room_id]
             user_w, user_h = user_dims[0], user_dims[1]
-            
-            # Calculate screen coordinates
-            x1 = offset_x + x * scale
-            y1 = offset_y + (height - y - h) * scale
-            x2 = x1 + w * scale
-            y2 = y1 + h * scale
-            
-            # Draw room rectangle
-            layout_canvas.create_rectangle(
-                x1, y1, x2, y2,
-                fill=ROOM_COLORS.get(room_id, "#CCCCCC"),
-                outline="black",
-                width=1
-            )
-            
-            # Draw room label and dimensions
-            center_x = (x1 + x2) / 2
-            center_y = (y1 + y2) / 2
-            
-            # Room label
-            layout_canvas.create_text(
-                center_x, center_y - 15,
-                text=label,
-                fill="black",
-                font=("Arial", 9, "bold"),
-                anchor="center"
-            )
-            
-            # Actual dimensions
-            layout_canvas.create_text(
-                center_x, center_y,
-                text=f"{w}x{h}",
-                fill="black", 
-                font=("Arial", 8),
-                anchor="center"
-            )
-            
-            # User requested dimensions (in brackets)
-            layout_canvas.create_text(
-                center_x, center_y + 15,
-                text=f"(from {user_w}x{user_h})",
-                fill="black",
-                font=("Arial", 7),
-                anchor="center"
+            center_x, center_y = room_center(room_id)
+
+            parts = (
+                (("room", room_id), "rectangle", "room", (x, y, w, h),
+                 {"fill": ROOM_COLORS.get(room_id, "#CCCCCC"), "outline": "black", "width": 1}),
+                # Room label
+                (("room", room_id, "label"), "text", "label", (center_x, center_y, -15),
+                 {"text": label, "fill": "black", "font": ("Arial", 9, "bold"), "anchor": "center"}),
+                # Actual dimensions
+                (("room", room_id, "size"), "text", "label", (center_x, center_y, 0),
+                 {"text": f"{w}x{h}", "fill": "black", "font": ("Arial", 8), "anchor": "center"}),
+                # User requested dimensions (in brackets)
+                (("room", room_id, "request"), "text", "label", (center_x, center_y, 15),
+                 {"text": f"(from {user_w}x{user_h})", "fill": "black", "font": ("Arial", 7), "anchor": "center"}),
             )
+            for key, kind, layer, geometry, options in parts:
+                keep.add(key)
+                created |= put_item(key, kind, layer, geometry, **options)
+
+        # Adjacency lines on top (green for satisfied, red dashed for unsatisfied)
+        created |= draw_adjacency_lines(keep)
+
+        prune_scene(keep)
+        if created:
+            restack_scene()
 
-            # Draw adjacency lines (green) - on top of rooms
-            draw_adjacency_lines(offset_x, offset_y, scale, height)
-        
-            # Draw unsatisfied adjacency lines (red dashed) - on top of rooms  
-            draw_unsatisfied_adjacency_lines(offset_x, offset_y, scale, height)
-        
     except Exception as e:
         print(f"Error drawing layout: {e}")
 
-def draw_holes(offset_x, offset_y, scale, grid_height):
+def draw_holes(keep):
     """Draw holes as WHITE rectangles (changed from red)"""
-    for hole in user_inputs.get("holes", []):
-        x, y, w, h = hole
-        # Convert to screen coordinates
-        x1 = offset_x + x * scale
-        y1 = offset_y + (grid_height - y - h) * scale
-        x2 = x1 + w * scale
-        y2 = y1 + h * scale
-        # Draw hole as WHITE rectangle (changed from red)
-        layout_canvas.create_rectangle(
-            x1, y1, x2, y2,
-            fill="white",     # Changed from "#d63031" to "white"
-            outline="gray",   # Changed from "#a61e1e" to "gray"
-            width=1
-        )
-
-def draw_adjacency_lines(offset_x, offset_y, scale, grid_height):
-    """Draw GREEN lines for satisfied adjacencies"""
-    for edge in actual_edges_satisfied:
-        room1, room2 = edge
-        if room1 in room_placements and room2 in room_placements:
-            r1_data = room_placements[room1]
-            r2_data = room_placements[room2]
-            r1_x = r1_data["pos"][0] + r1_data["size"][0] / 2
-            r1_y = r1_data["pos"][1] + r1_data["size"][1] / 2
-            r2_x = r2_data["pos"][0] + r2_data["size"][0] / 2
-            r2_y = r2_data["pos"][1] + r2_data["size"][1] / 2
-            x1 = offset_x + r1_x * scale
-            y1 = offset_y + (grid_height - r1_y) * scale
-            x2 = offset_x + r2_x * scale
-            y2 = offset_y + (grid_height - r2_y) * scale
-            layout_canvas.create_line(
-                x1, y1, x2, y2,
-                fill="lime",      # Bright green
-                width=2
-            )
-
-def draw_unsatisfied_adjacency_lines(offset_x, offset_y, scale, grid_height):
-    """Draw RED dashed lines for unsatisfied adjacencies"""
-    all_edges = set(user_inputs.get("edges", []))
-    satisfied_edges = set(actual_edges_satisfied)
-    unsatisfied_edges = all_edges - satisfied_edges
-    for edge in unsatisfied_edges:
+    created = False
+    for i, hole in enumerate(user_inputs.get("holes", [])):
+        keep.add(("hole", i))
+        created |= put_item(("hole", i), "rectangle", "hole", tuple(hole),
+                            fill="white", outline="gray", width=1)
+    return created
+
+def room_center(room_id):
+    """Center of a placed room, in grid units"""
+    x, y, w, h = room_placements[room_id]
+    return x + w / 2, y + h / 2
+
+def draw_adjacency_lines(keep):
+    """Draw GREEN lines for satisfied adjacencies and RED dashed lines for the rest"""
+    created = False
+    satisfied = Counter(actual_edges_satisfied)
+    occurrences = Counter()
+    for edge in user_inputs.get("edges", []):
         room1, room2 = edge
-        if room1 in room_placements and room2 in room_placements:
-            r1_data = room_placements[room1]
-            r2_data = room_placements[room2]
-            r1_x = r1_data["pos"][0] + r1_data["size"][0] / 2
-            r1_y = r1_data["pos"][1] + r1_data["size"][1] / 2
-            r2_x = r2_data["pos"][0] + r2_data["size"][0] / 2
-            r2_y = r2_data["pos"][1] + r2_data["size"][1] / 2
-            x1 = offset_x + r1_x * scale
-            y1 = offset_y + (grid_height - r1_y) * scale
-            x2 = offset_x + r2_x * scale
-            y2 = offset_y + (grid_height - r2_y) * scale
-            layout_canvas.create_line(
-                x1, y1, x2, y2,
-                fill="red",
-                width=2,
-                dash=(8,4)
-            )
+        if room1 not in room_placements or room2 not in room_placements:
+            continue
+        occurrences[edge] += 1
+        key = ("edge", room1, room2, occurrences[edge])
+        if satisfied[edge] > 0:
+            satisfied[edge] -= 1
+            options = {"fill": "lime", "width": 2, "dash": ()}  # Bright green
+        else:
+            options = {"fill": "red", "width": 2, "dash": (8, 4)}
+        keep.add(key)
+        created |= put_item(key, "line", "edge", room_center(room1) + room_center(room2), **options)
+    return created
+
+def on_canvas_resize(event):
+    """Fit the scene to the new canvas size by rescaling the existing items"""
+    if scene_view is None:
+        schedule_preview()  # the canvas just got its size: show the preview of loaded inputs
+        return
+    view = compute_view(scene_view[3], scene_view[4])
+    if view is not None:
+        set_view(view)
+
+def schedule_preview(*args):
+    """Redraw the preview once typing pauses: each keystroke replaces the pending redraw"""
+    global preview_after_id
+    if preview_after_id is not None:
+        layout_canvas.after_cancel(preview_after_id)
+    preview_after_id = layout_canvas.after(PREVIEW_DELAY_MS, draw_preview)
+
+def on_hole_entry_change(index):
+    """Update canvas when the entries of hole `index` change"""
+    dirty_holes.add(index)
+    schedule_preview()
+    schedule_auto_solve()
+
+def schedule_auto_solve(*args):
+    """Re-solve once editing pauses, if enabled: each edit replaces the pending re-solve"""
+    global auto_solve_after_id
+    if auto_solve_after_id is not None:
+        root.after_cancel(auto_solve_after_id)
+        auto_solve_after_id = None
+    if auto_solve_var.get():
+        auto_solve_after_id = root.after(AUTO_SOLVE_DELAY_MS, auto_solve)
+
+def auto_solve():
+    global auto_solve_after_id
+    auto_solve_after_id = None
+    if active_budget is not None:
+        # Let the running solve finish, then solve the latest inputs
+        auto_solve_after_id = root.after(AUTO_SOLVE_DELAY_MS, auto_solve)
+        return
+    submit_data(quiet=True)
 
-def on_hole_entry_change(*args):
-    """Update canvas when hole entries change"""
-    layout_canvas.after(50, draw_preview)
+def parse_hole(index):
+    """(x, y, w, h) from the entries of hole `index`, or None while any is blank or invalid"""
+    try:
+        values = [entry.get() for entry in hole_entries[index]]
+        if not all(values):
+            return None
+        return tuple(int(value) for value in values)
+    except (ValueError, IndexError):
+        return None
+
+def preview_rooms():
+    """{name: (min_w, min_h)} of every room whose min size is filled in"""
+    rooms = {}
+    for name in room_names:
+        try:
+            min_w, min_h = int(room_entries[name][0].get()), int(room_entries[name][1].get())
+        except ValueError:
+            continue
+        if min_w > 0 and min_h > 0:
+            rooms[name] = (min_w, min_h)
+    return rooms
+
+def draw_footprints(keep, width, height):
+    """Rooms at their min size, greedily packed around the holes: a quick fit check before solving"""
+    global preview_footprints
+    rooms = preview_rooms()
+    holes = [hole for _, hole in sorted(hole_geometry.items()) if hole]
+    inputs = (width, height, tuple(holes), tuple(rooms.items()))
+    if preview_footprints is None or preview_footprints[0] != inputs:
+        preview_footprints = (inputs, *bottom_left_packing(rooms, width, height, holes))
+    _, placed, unplaced = preview_footprints
+
+    created = False
+    for name, (x, y, w, h) in placed.items():
+        label = room_entries[name][4].get() or name
+        keep.update({("footprint", name), ("footprint", name, "label")})
+        created |= put_item(("footprint", name), "rectangle", "room", (x, y, w, h),
+                            fill=ROOM_COLORS.get(name, "#CCCCCC"), outline="black", width=1, dash=(4, 2))
+        created |= put_item(("footprint", name, "label"), "text", "label", (x + w / 2, y + h / 2, 0),
+                            text=f"{label}\n{w}x{h}", fill="black", font=("Arial", 8), anchor="center")
+    if unplaced:
+        keep.add(("footprint", "unplaced"))
+        created |= put_item(("footprint", "unplaced"), "text", "label", (width / 2, height, -12),
+                            text=f"Do not fit at min size: {', '.join(sorted(unplaced))}",
+                            fill="red", font=("Arial", 9, "bold"), anchor="s")
+    return created
 
 def draw_preview():
-    """Draw preview with holes while user is inputting"""
+    """Draw preview with holes and min-size room footprints while user is inputting"""
+    global preview_after_id
+    preview_after_id = None
     if not entry_width.get() or not entry_height.get():
         return
-        
+
     try:
         width = int(entry_width.get())
         height = int(entry_height.get())
-        
+        if width <= 0 or height <= 0:
+            return
+
         # Only redraw if we're not showing a full layout
         if not room_placements:
-            layout_canvas.delete("all")
-            
-            canvas_width = layout_canvas.winfo_width()
-            canvas_height = layout_canvas.winfo_height()
-            
-            if canvas_width <= 1 or canvas_height <= 1:
+            view = compute_view(width, height)
+            if view is None:
                 return
-                
-            scale = min(canvas_width / width, canvas_height / height) * 0.85
-            offset_x = (canvas_width - width * scale) / 2
-            offset_y = (canvas_height - height * scale) / 2
-            
-            # Draw grid outline
-            layout_canvas.create_rectangle(
-                offset_x, offset_y,
-                offset_x + width * scale, offset_y + height * scale,
-                outline=FG_COLOR, width=2
-            )
-            
-            # Draw holes from current input
-            for i, hole_entry_set in enumerate(hole_entries):
-                try:
-                    if all(entry.get() for entry in hole_entry_set):
-                        x = int(hole_entry_set[0].get())
-                        y = int(hole_entry_set[1].get())
-                        w = int(hole_entry_set[2].get())
-                        h = int(hole_entry_set[3].get())
-                        
-                        # Convert to screen coordinates
-                        x1 = offset_x + x * scale
-                        y1 = offset_y + (height - y - h) * scale
-                        x2 = x1 + w * scale
-                        y2 = y1 + h * scale
-                        
-                        # Draw hole as red rectangle
-                        layout_canvas.create_rectangle(
-                            x1, y1, x2, y2,
-                            fill="#f9f8f8",
-                            outline="#7a7a7a",
-                            width=1
-                        )
-                except (ValueError, IndexError):
-                    continue
-                    
+            set_view(view)
+
+            # Re-parse only the holes edited since the last preview
+            for index in dirty_holes:
+                hole_geometry[index] = parse_hole(index)
+            dirty_holes.clear()
+
+            # Grid outline
+            keep = set()
+            created = put_outline(keep)
+
+            # Holes from current input (put_item leaves unchanged ones alone)
+            for index, hole in hole_geometry.items():
+                if hole is not None:
+                    keep.add(("hole", index))
+                    created |= put_item(("hole", index), "rectangle", "hole", hole,
+                                        fill="#f9f8f8", outline="#7a7a7a", width=1)
+
+            created |= draw_footprints(keep, width, height)
+
+            prune_scene(keep)
+            if created:
+                restack_scene()
+
     except ValueError:
         pass
 
@@ -482,6 +702,8 @@ def generate_hole_fields():
         num = int(entry_num_holes.get()) if entry_num_holes.get() else 0
         global hole_entries
         hole_entries = []
+        hole_geometry.clear()
+        dirty_holes.clear()
 
         for i in range(num):
             label = tk.Label(hole_frame, text=f"Hole #{i+1} (x y w h):", bg=BG_COLOR, fg=FG_COLOR)
@@ -494,7 +716,7 @@ def generate_hole_fields():
 
             # Bind change events for dynamic preview
             for entry in [x_entry, y_entry, w_entry, h_entry]:
-                entry.bind('<KeyRelease>', on_hole_entry_change)
+                entry.bind('<KeyRelease>', lambda event, index=i: on_hole_entry_change(index))
 
             x_entry.grid(row=i, column=1, padx=2)
             y_entry.grid(row=i, column=2, padx=2)
@@ -504,7 +726,7 @@ def generate_hole_fields():
             hole_entries.append((x_entry, y_entry, w_entry, h_entry))
             
         # Trigger initial preview
-        draw_preview()
+        schedule_preview()
 
     except ValueError:
         pass
@@ -540,12 +762,14 @@ dim_frame.pack(fill="x", pady=5)
 tk.Label(dim_frame, text="Width:", bg=BG_COLOR, fg=FG_COLOR).pack(side="left")
 entry_width = tk.Entry(dim_frame, width=8, bg=ENTRY_BG, fg=ENTRY_FG, insertbackground=FG_COLOR)
 entry_width.pack(side="left", padx=5)
-entry_width.bind('<KeyRelease>', on_hole_entry_change)
+entry_width.bind('<KeyRelease>', schedule_preview)
+entry_width.bind('<KeyRelease>', schedule_auto_solve, add="+")
 
 tk.Label(dim_frame, text="Height:", bg=BG_COLOR, fg=FG_COLOR).pack(side="left")
 entry_height = tk.Entry(dim_frame, width=8, bg=ENTRY_BG, fg=ENTRY_FG, insertbackground=FG_COLOR)
 entry_height.pack(side="left", padx=5)
-entry_height.bind('<KeyRelease>', on_hole_entry_change)
+entry_height.bind('<KeyRelease>', schedule_preview)
+entry_height.bind('<KeyRelease>', schedule_auto_solve, add="+")
 
 # Holes
 holes_frame = tk.Frame(form_frame, bg=BG_COLOR)
@@ -593,12 +817,19 @@ for name in room_names:
     
     room_entries[name] = (w_entry, h_entry, max_w_entry, max_h_entry, label_entry)
 
+    # Min size and label edits update the room footprints in the preview
+    for entry in (w_entry, h_entry, label_entry):
+        entry.bind('<KeyRelease>', schedule_preview)
+    for entry in room_entries[name]:
+        entry.bind('<KeyRelease>', schedule_auto_solve, add="+")
+
 # Adjacency edges
 tk.Label(form_frame, text="Adjacency (A B):", font=("Arial", 10, "bold"), 
          bg=BG_COLOR, fg=FG_COLOR).pack(pady=5)
 
 text_edges = tk.Text(form_frame, height=8, bg=ENTRY_BG, fg=ENTRY_FG, insertbackground=FG_COLOR)
 text_edges.pack(fill="x", pady=5)
+text_edges.bind('<KeyRelease>', schedule_auto_solve)
 
 # Buttons
 button_frame = tk.Frame(form_frame, bg=BG_COLOR)
@@ -608,10 +839,24 @@ submit_btn = tk.Button(button_frame, text="Generate Layout", command=submit_data
                       bg=BUTTON_BG, fg=FG_COLOR, activebackground=BUTTON_ACTIVE)
 submit_btn.pack(side="left", padx=5)
 
+cancel_btn = tk.Button(button_frame, text="Cancel", command=cancel_solve, state="disabled",
+                      bg=BUTTON_BG, fg=FG_COLOR, activebackground=BUTTON_ACTIVE)
+cancel_btn.pack(side="left", padx=5)
+
 help_btn = tk.Button(button_frame, text="Help", command=show_instructions,
                     bg=BUTTON_BG, fg=FG_COLOR, activebackground=BUTTON_ACTIVE)
 help_btn.pack(side="left", padx=5)
 
+auto_solve_var = tk.BooleanVar(value=False)
+auto_solve_check = tk.Checkbutton(button_frame, text="Auto re-solve", variable=auto_solve_var,
+                                  bg=BG_COLOR, fg=FG_COLOR, selectcolor=ENTRY_BG,
+                                  activebackground=BG_COLOR, activeforeground=FG_COLOR)
+auto_solve_check.pack(side="left", padx=5)
+
+# Solver progress (removal count, candidates tried, elapsed time) while solving
+progress_label = tk.Label(form_frame, text="", bg=BG_COLOR, fg=FG_COLOR, anchor="w")
+progress_label.pack(fill="x")
+
 # Layout display (right panel)
 tk.Label(right_panel, text="Floor Plan Layout", font=("Arial", 14, "bold"), 
          bg=BG_COLOR, fg=FG_COLOR).pack(pady=5)
@@ -619,6 +864,7 @@ tk.Label(right_panel, text="Floor Plan Layout", font=("Arial", 14, "bold"),
 layout_canvas = tk.Canvas(right_panel, bg=CANVAS_BG, highlightthickness=1, 
                          highlightbackground=FG_COLOR)
 layout_canvas.pack(fill="both", expand=True, padx=5, pady=5)
+layout_canvas.bind("<Configure>", on_canvas_resize)
 
 # Initialize
 hole_entries = []
@@ -0,0 +1,91 @@
+"""
+Matplotlib rendering of solved layouts.
+
+Kept apart from GN_assignment so the solver (and everything that only solves, like
+the GUI and the batch workers) never imports matplotlib.
+"""
+import matplotlib.pyplot as plt
+import matplotlib.patches as patches
+
+
+def visualize_boundary(ax, outer_width, outer_height, holes):
+    outer_rect = patches.Rectangle(
+        (0, 0),
+        outer_width,
+        outer_height,
+        linewidth=2,
+        edgecolor="blue",
+        facecolor="none",
+        linestyle="-",
+        alpha=0.7,
+    )
+    ax.add_patch(outer_rect)
+
+    for i, (x, y, width, height) in enumerate(holes):
+        hole_rect = patches.Rectangle(
+            (x, y),
+            width,
+            height,
+            linewidth=2,
+            edgecolor="red",
+            facecolor="red",
+            alpha=0.3,
+        )
+        ax.add_patch(hole_rect)
+
+
+def plot_layout(rectangles, outer_width, outer_height, holes):
+    """Show the stretched `rectangles` ({name: (x, y, w, h)}) inside the boundary in a matplotlib window."""
+    fig, ax = plt.subplots(figsize=(10, 8))
+
+    colors = [
+        "lightblue", "lightgreen", "lightcoral", "lightyellow", "lightpink",
+        "lightgrey", "lightsalmon", "lightcyan", "lightseagreen", "lightsteelblue",
+    ]
+
+    visualize_boundary(ax, outer_width, outer_height, holes)
+
+    for i, (name, (x, y, w, h)) in enumerate(rectangles.items()):
+        rect = patches.Rectangle(
+            (x, y),
+            w,
+            h,
+            linewidth=2,
+            edgecolor="black",
+            facecolor=colors[i % len(colors)],
+        )
+        ax.add_patch(rect)
+
+        # Calculate center of the STRETCHED rectangle
+        stretched_center_x = x + w / 2
+        stretched_center_y = y + h / 2
+
+        # Create text using STRETCHED dimensions (w, h from loop)
+        dimension_text = f"{w}x{h}"
+        display_text = f"{name}\n{dimension_text}"
+
+        ax.text(
+            stretched_center_x, # Use stretched center X
+            stretched_center_y, # Use stretched center Y
+            display_text,       # Show name + stretched dimensions
+            ha="center",
+            va="center",
+            fontsize=10,
+            fontweight="bold",
+        )
+
+    ax.grid(True, linestyle="--", alpha=0.7)
+    ax.set_aspect("equal")
+    ax.set_xlim(-0.5, outer_width + 0.5)
+    ax.set_ylim(-0.5, outer_height + 0.5)
+    ax.set_title("Room Layout Solution")
+    ax.set_xlabel("X-coordinate")
+    ax.set_ylabel("Y-coordinate")
+
+    for i in range(outer_width + 1):
+        ax.text(i, -0.25, str(i), ha="center")
+    for i in range(outer_height + 1):
+        ax.text(-0.25, i, str(i), ha="center")
+
+    plt.tight_layout()
+    plt.show()